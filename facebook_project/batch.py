@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from facebook import facebook_friend
+
+CHUNK_EDGES = 20000     # small instances are grouped up to this many edges
+MAX_CHUNK = 256         # and at most this many instances per task
+
+def _solve_chunk(solve, chunk, options):
+  """Solve the (k, V, E) instances of chunk; return (k, result, error) triples."""
+  out = []
+  for k, V, E in chunk:
+    try:
+      out.append((k, solve(V, E, **options), None))
+    except Exception as e:
+      out.append((k, None, e))
+  return out
+
+class BatchSolver:
+  """Many independent instances solved on one persistent process pool.
+
+  The pool is started on first use and kept until close(), so its start-up
+  cost is paid once per job instead of once per batch.  Small instances are
+  sent to the workers in chunks of up to chunk_edges edges, which keeps the
+  per-task overhead low; an instance as large as a chunk is sent alone.
+  With processes == 1 everything runs in the calling process.
+  """
+
+  def __init__(self, solve=facebook_friend, processes=None, chunk_edges=CHUNK_EDGES):
+    """solve is called as solve(V, E, **options); it must be picklable."""
+    self.solve = solve
+    self.processes = processes or os.cpu_count() or 1
+    self.chunk_edges = chunk_edges
+    self._pool = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def close(self):
+    """Shut the worker processes down."""
+    if self._pool is not None:
+      self._pool.shutdown()
+      self._pool = None
+
+  def _chunks(self, instances):
+    """Group the (V, E) instances into lists of (k, V, E)."""
+    chunk = []
+    edges = 0
+    for k, (V, E) in enumerate(instances):
+      if len(E) >= self.chunk_edges:
+        yield [(k, V, E)]
+        continue
+      chunk.append((k, V, E))
+      edges += len(E)
+      if edges >= self.chunk_edges or len(chunk) >= MAX_CHUNK:
+        yield chunk
+        chunk = []
+        edges = 0
+    if chunk:
+      yield chunk
+
+  def solve_many(self, instances, **options):
+    """Yield (k, result) for the k-th (V, E) of instances, as each completes.
+
+    instances may be a lazy iterable: only a few tasks per worker are in
+    flight at a time.  An exception raised by solve is raised again here,
+    after the results that completed before it.
+    """
+    if self.processes < 2:
+      for chunk in self._chunks(instances):
+        for k, result, error in _solve_chunk(self.solve, chunk, options):
+          if error is not None:
+            raise error
+          yield k, result
+      return
+    if self._pool is None:
+      self._pool = ProcessPoolExecutor(self.processes)
+    chunks = self._chunks(instances)
+    pending = set()
+    try:
+      while True:
+        while len(pending) < 2 * self.processes:
+          chunk = next(chunks, None)
+          if chunk is None:
+            break
+          pending.add(self._pool.submit(_solve_chunk, self.solve, chunk, options))
+        if not pending:
+          return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          for k, result, error in future.result():
+            if error is not None:
+              raise error
+            yield k, result
+    finally:
+      for future in pending:
+        future.cancel()
+
+  def solve_all(self, instances, **options):
+    """Return the list of results of instances, in input order."""
+    results = dict(self.solve_many(instances, **options))
+    return [results[k] for k in range(len(results))]
+
+def solve_batch(instances, solve=facebook_friend, processes=None, **options):
+  """Return the results of solve on every (V, E) of instances, in order.
+
+  A one-off BatchSolver; keep a BatchSolver to reuse its pool across calls.
+  """
+  with BatchSolver(solve, processes) as solver:
+    return solver.solve_all(instances, **options)
@@ -0,0 +1,166 @@
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from random import Random
+from time import perf_counter
+from facebook import facebook_friend, facebook_enmy
+from mytest import read_graph1, read_graph2
+from scoring import enemy_score, friend_score
+
+#------------------------- graph generators -------------------------
+def random_graph(n, degree, rng):
+    """Return the edge set of an Erdos-Renyi style graph of average degree."""
+    m = min(n * degree // 2, n * (n - 1) // 2)
+    edges = set()
+    while len(edges) < m:
+        u = rng.randrange(n)
+        v = rng.randrange(n)
+        if u != v and (v, u) not in edges:
+            edges.add((u, v))
+    return edges
+
+def barabasi_albert(n, degree, rng):
+    """Return the edge set of a Barabasi-Albert power-law graph."""
+    k = max(1, degree // 2)
+    edges = set()
+    ends = list(range(k + 1))        # every vertex once per incident edge
+    for u in range(k + 1):
+        for v in range(u):
+            edges.add((u, v))
+            ends.append(u)
+            ends.append(v)
+    for u in range(k + 1, n):
+        targets = set()
+        while len(targets) < k:
+            targets.add(rng.choice(ends))
+        for v in targets:
+            edges.add((u, v))
+            ends.append(u)
+            ends.append(v)
+    return edges
+
+def planted_bipartition(n, degree, rng, inside=0.1):
+    """Return (edges, group): a graph whose edges mostly cross two groups.
+
+    Only a fraction inside of the edges joins users of the same group, so
+    the planted grouping is a good cut to compare the solvers against.
+    """
+    group = [rng.random() < 0.5 for _ in range(n)]
+    m = min(n * degree // 2, n * (n - 1) // 2)
+    edges = set()
+    while len(edges) < m:
+        u = rng.randrange(n)
+        v = rng.randrange(n)
+        if u == v or (v, u) in edges:
+            continue
+        if (group[u] == group[v]) == (rng.random() < inside):
+            edges.add((u, v))
+    return edges, group
+
+GENERATORS = {
+    'random': lambda n, degree, rng: (random_graph(n, degree, rng), None),
+    'power_law': lambda n, degree, rng: (barabasi_albert(n, degree, rng), None),
+    'planted': planted_bipartition,
+}
+
+#------------------------- input files -------------------------
+def write_graph1(filename, edges, rng, max_weight=100):
+    """Write edges in the read_graph1 format with random weights."""
+    with open(filename, 'w') as outfile:
+        for u, v in edges:
+            outfile.write('u{0} u{1} {2}\n'.format(u, v, rng.randint(1, max_weight)))
+
+def write_graph2(filename, n, edges, rng, group=None, max_weight=100):
+    """Write a read_graph2 file; preferences lean towards group if given."""
+    with open(filename, 'w') as outfile:
+        for u in range(n):
+            dem = rng.randint(0, max_weight)
+            rep = rng.randint(0, max_weight)
+            if group is not None and (dem > rep) != group[u]:
+                dem, rep = rep, dem
+            outfile.write('u{0} {1} {2}\n'.format(u, dem, rep))
+        outfile.write('Edges\n')
+        for u, v in edges:
+            outfile.write('u{0} u{1} {2}\n'.format(u, v, rng.randint(1, max_weight)))
+
+SOLVERS = {
+    'enmy': (1, facebook_enmy, {}),
+    'enmy_refine': (1, facebook_enmy, {'refine': True, 'time_limit': 10}),
+    'friend_dinic': (2, facebook_friend, {'method': 'dinic'}),
+    'friend_push_relabel': (2, facebook_friend, {'method': 'push_relabel'}),
+}
+
+def quality(fmt, V, E, result):
+    """Return the mytest1 (fmt 1) or mytest2 (fmt 2) objective of result."""
+    if fmt == 1:
+        return enemy_score(E, *result)
+    return friend_score(V, E, *result)
+
+#------------------------- runner -------------------------
+def measure(solve, V, E, options, memory=True):
+    """Run solve once timed, and once more under tracemalloc if memory."""
+    start = perf_counter()
+    result = solve(V, E, **options)
+    seconds = perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            solve(V, E, **options)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+def run(sizes, degree=8, solvers=None, generators=None, budget=60.0, seed=0, memory=True, log=None):
+    """Benchmark the solvers on generated graphs of growing size.
+
+    Every graph is written in the input format of the solver and read back
+    with read_graph1/read_graph2.  Once a solver needs more than budget
+    seconds on a kind of graph it is not run on larger ones.  Return a list
+    of one record (a dict) per run.
+    """
+    solvers = solvers or sorted(SOLVERS)
+    generators = generators or sorted(GENERATORS)
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in generators:
+            slow = set()
+            for n in sizes:
+                rng = Random('{0}/{1}/{2}'.format(seed, kind, n))
+                edges, group = GENERATORS[kind](n, degree, rng)
+                paths = {1: os.path.join(tmp, 'graph1.txt'), 2: os.path.join(tmp, 'graph2.txt')}
+                write_graph1(paths[1], edges, rng)
+                write_graph2(paths[2], n, edges, rng, group)
+                inputs = {1: read_graph1(paths[1]), 2: read_graph2(paths[2])}
+                for name in solvers:
+                    if name in slow:
+                        continue
+                    fmt, solve, options = SOLVERS[name]
+                    V, E = inputs[fmt]
+                    result, seconds, peak = measure(solve, V, E, options, memory)
+                    record = {
+                        'solver': name, 'graph': kind, 'users': len(V), 'edges': len(E),
+                        'seconds': seconds, 'peak_bytes': peak,
+                        'quality': quality(fmt, V, E, result),
+                    }
+                    if group is not None and fmt == 1:
+                        planted = ({'u%d' % u for u in range(n) if group[u]},
+                                   {'u%d' % u for u in range(n) if not group[u]})
+                        record['planted_quality'] = quality(fmt, V, E, planted)
+                    records.append(record)
+                    if log is not None:
+                        log(record)
+                    if seconds > budget:
+                        slow.add(name)
+    return records
+
+if __name__ == '__main__':
+    # usage: python benchmark.py [results.json [size ...]]
+    out = sys.argv[1] if len(sys.argv) > 1 else 'bench_results.json'
+    sizes = [int(x) for x in sys.argv[2:]] or [250, 1000, 4000, 16000]
+    records = run(sizes, log=lambda rec: print(json.dumps(rec)))
+    with open(out, 'w') as outfile:
+        json.dump(records, outfile, indent=1)
@@ -0,0 +1,164 @@
+import os
+import pickle
+import tempfile
+from array import array
+from collections import OrderedDict
+from hashlib import blake2b
+from itertools import chain, islice
+
+BLOCK = 1 << 16         # names hashed per update, bounding the memory used
+IGNORED = frozenset(['profile', 'workers'])   # options that never change a result
+
+def _names(h, names):
+  """Feed a sequence of names to h, unambiguously and in blocks."""
+  names = iter(names)
+  while True:
+    block = list(islice(names, BLOCK))
+    if not block:
+      return
+    try:
+      text = '\x00'.join(block)
+    except TypeError:                  # names that are not strings
+      h.update(repr(block).encode('utf-8', 'surrogatepass'))
+      continue
+    h.update(array('q', map(len, block)).tobytes())
+    h.update(text.encode('utf-8', 'surrogatepass'))
+
+def _numbers(h, values):
+  """Feed a sequence of numbers to h."""
+  values = list(values)
+  try:
+    h.update(array('q', values).tobytes())
+  except (TypeError, OverflowError):  # floats or huge integers
+    h.update(repr(values).encode())
+
+def content_hash(V, E, *extra):
+  """Return a hex digest identifying the (V, E) input and extra.
+
+  Edges are hashed in order, because the solvers break ties by input
+  order.  V is hashed in iteration order too, even if it is a set: user ids
+  follow that order, and facebook_enmy's refinement and restarts depend on
+  it.  Preferences (the values of V if it is a dict) and weights are hashed
+  as packed integers, so hashing costs a fraction of a solve.
+  """
+  h = blake2b(digest_size=20)
+  h.update(b'V%d' % len(V))
+  _names(h, V)
+  if isinstance(V, dict):
+    _numbers(h, chain.from_iterable(V.values()))
+  h.update(b'E%d' % len(E))
+  _names(h, chain.from_iterable(E))
+  _numbers(h, E.values())
+  h.update(repr(extra).encode())
+  return h.hexdigest()
+
+class ResultCache:
+  """Results of facebook_enmy / facebook_friend keyed by input content.
+
+  Results are kept pickled in memory, least recently used first out once
+  they take more than max_bytes.  If directory is given every result is
+  also written there, and read back on a miss in memory; only point it at
+  a directory this program alone writes, as its files are unpickled.
+  Each hit returns a fresh copy, so callers may modify what they get.
+  """
+
+  def __init__(self, max_bytes=64 << 20, directory=None):
+    self.max_bytes = max_bytes
+    self.directory = directory
+    self._entries = OrderedDict()      # key -> pickled result
+    self._bytes = 0
+    self._hits = 0
+    self._disk_hits = 0
+    self._misses = 0
+    self._evictions = 0
+    if directory is not None:
+      os.makedirs(directory, exist_ok=True)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, key):
+    return key in self._entries or (self.directory is not None
+                                    and os.path.exists(self._path(key)))
+
+  def key(self, solve, V, E, **options):
+    """Return the key of solve(V, E, **options)."""
+    name = '{0}.{1}'.format(solve.__module__, solve.__qualname__)
+    kept = sorted((k, v) for k, v in options.items() if k not in IGNORED)
+    return content_hash(V, E, name, kept)
+
+  def solve(self, solve, V, E, **options):
+    """Return solve(V, E, **options), computing it only on a miss."""
+    key = self.key(solve, V, E, **options)
+    data = self._load(key)
+    if data is None:
+      self._misses += 1
+      result = solve(V, E, **options)
+      self.put(key, result)
+      return result
+    return pickle.loads(data)
+
+  def get(self, key, default=None):
+    """Return the result stored under key, or default."""
+    data = self._load(key)
+    return default if data is None else pickle.loads(data)
+
+  def put(self, key, result):
+    """Store result under key, in memory and on disk if there is a directory."""
+    data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    if self.directory is not None:
+      fd, tmp = tempfile.mkstemp(dir=self.directory)
+      with os.fdopen(fd, 'wb') as outfile:
+        outfile.write(data)
+      os.replace(tmp, self._path(key))  # readers never see a partial file
+    self._remember(key, data)
+
+  def clear(self):
+    """Forget the results held in memory (the disk store is kept)."""
+    self._entries.clear()
+    self._bytes = 0
+
+  def stats(self):
+    """Return a dict of hit, miss and eviction counts and the memory used."""
+    return {
+      'entries': len(self._entries),
+      'bytes': self._bytes,
+      'hits': self._hits,
+      'disk_hits': self._disk_hits,
+      'misses': self._misses,
+      'evictions': self._evictions,
+    }
+
+  def _path(self, key):
+    return os.path.join(self.directory, key + '.pickle')
+
+  def _load(self, key):
+    """Return the pickled result of key, from memory or disk, or None."""
+    data = self._entries.get(key)
+    if data is not None:
+      self._entries.move_to_end(key)
+      self._hits += 1
+      return data
+    if self.directory is None:
+      return None
+    try:
+      with open(self._path(key), 'rb') as infile:
+        data = infile.read()
+    except FileNotFoundError:
+      return None
+    self._disk_hits += 1
+    self._remember(key, data)
+    return data
+
+  def _remember(self, key, data):
+    old = self._entries.pop(key, None)
+    if old is not None:
+      self._bytes -= len(old)
+    if len(data) > self.max_bytes:
+      return                           # would evict everything else
+    self._entries[key] = data
+    self._bytes += len(data)
+    while self._bytes > self.max_bytes:
+      _, dropped = self._entries.popitem(last=False)
+      self._bytes -= len(dropped)
+      self._evictions += 1
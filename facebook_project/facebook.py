@@ -1,42 +1,143 @@
 from graph import *
-def facebook_enmy(V,E):
-        d = set()
-        r = set()
-        vertex = []
-        for edge in OrderedDict(sorted(E.items(), key = lambda kv :kv[1], reverse= True)):
-                if edge[0] not in V or edge[1] not in V:
-                        raise Exception('the arc in E is not present in V.')
-                if (edge[0] not in vertex):
-                        if(edge[1] not in vertex):
-                                vertex.append(edge[0])
-                                vertex.append(edge[1])
-                                r.add(edge[0])
-                                d.add(edge[1])
-                        else:
-                                if(edge[1] not in r):
-                                        vertex.append(edge[0])
-                                        r.add(edge[0])
-                                else:
-                                        vertex.append(edge[0])
-                                        d.add(edge[0])
-                else:
-                        if (edge[1] not in vertex):
-                                if(edge[0] not in r):
-                                        vertex.append(edge[1])
-                                        r.add(edge[1])
-                                else:
-                                        vertex.append(edge[1])
-                                        d.add(edge[1])
+from flow import cut_network, max_flow
+from interning import Interner
+from components import solve_components
+from reduction import CutReduction
+from instrument import NO_PROFILE
+from maxcut import DEM, REP, BOTH, enmy_arrays, refine_arrays
+def facebook_enmy(V,E,refine=False,max_moves=None,time_limit=None,restarts=0,workers=None,profile=None,components=False):
+        prof = profile or NO_PROFILE
+        if components:
+                # only the greedy decides each component on its own
+                d, r = solve_components(facebook_enmy, V, E, workers, profile=prof)
+                if not (refine or restarts):
+                        prof.finish()
+                        return d, r
+        with prof.phase('intern'):
+                ids = Interner(V)
+                try:
+                        sources, targets, weights = ids.edges(E)
+                except KeyError:
+                        raise Exception('the arc in E is not present in V.') from None
+        if components:
+                side = bytearray(len(ids))
+                for i, x in enumerate(ids):
+                        side[i] = (DEM if x in d else 0) | (REP if x in r else 0)
+                side = refine_arrays(sources, targets, weights, side, refine, max_moves,
+                                     time_limit, restarts, workers, profile)
+        else:
+                side = enmy_arrays(sources, targets, weights, len(ids), refine, max_moves,
+                                   time_limit, restarts, workers, profile)
+        with prof.phase('output'):
+                d = set(ids.names(i for i, x in enumerate(side) if x == DEM or x == BOTH))
+                r = set(ids.names(i for i, x in enumerate(side) if x == REP or x == BOTH))
+        prof.count('users', len(ids))
+        prof.count('edges', len(sources))
+        prof.finish()
         return d, r
 
-def facebook_friend(V,E):
-        y = {}
-        G = Graph(directed=True)
-        for v in V:
-                y[v] = G.insert_vertex(v)
-        for x in E:
-                G.insert_edge(y[x[0]], y[x[1]], E[x])
-        G.modify(y,V)
-        order,paths = G.getAllPaths(y['s'],y['t'])
-        dem, repu = G.maxFlow(order,paths,'s','t')
+def facebook_friend(V,E,method='dinic',profile=None,components=False,workers=None,reduce=False):
+        prof = profile or NO_PROFILE
+        if components:
+                dem, repu = solve_components(facebook_friend, V, E, workers, profile=prof,
+                                             method=method, reduce=reduce)
+                prof.finish()
+                return dem, repu
+        ids, edges, dems, reps, value, mark = _friend_cut(V, E, method, prof, reduce)
+        dem = ids.names(i for i in range(len(ids)) if not mark[i])
+        repu = ids.names(i for i in range(len(ids)) if mark[i])
+        prof.count('users', len(ids))
+        prof.count('edges', len(edges[0]))
+        prof.finish()
         return dem,repu
+
+def _friend_cut(V,E,method,prof,reduce):
+        """Solve the cut of facebook_friend; return (ids, edges, dems, reps, value, mark).
+
+        edges holds the (sources, targets, weights) columns of E, value is
+        the maximum flow (the weight of the cut) and mark[i] is True if
+        user i is on the repu side.  prof times 'build', 'max_flow', 'cut'.
+        """
+        with prof.phase('build'):
+                ids = Interner(V)
+                sources, targets, weights = ids.edges(E)
+                dems = [V[v][0] for v in ids]
+                reps = [V[v][1] for v in ids]
+                if reduce:
+                        red = CutReduction(len(ids), sources, targets, weights, dems, reps)
+                        net, s, t = red.network()
+                else:
+                        net, s, t = cut_network(len(ids), sources, targets, weights, dems, reps)
+        with prof.phase('max_flow'):
+                value = max_flow(net, s, t, method, prof)
+        with prof.phase('cut'):
+                mark = net.sink_side(t)
+                if reduce:
+                        mark = red.sink_side(mark)
+                        value += red.cut_offset
+                        for key, n in red.stats().items():
+                                prof.count('reduced_' + key, n)
+        return ids, (sources, targets, weights), dems, reps, value, mark
+
+def friend_certificate(V,E,method='dinic',profile=None,reduce=False):
+        """Solve facebook_friend and return a dict explaining the cut.
+
+        'dem' and 'repu' are the answer of facebook_friend.  'cut_edges'
+        lists the arcs of its network from the dem side to the repu side as
+        (a, b, capacity): user by user, its cut friendships and its rep
+        preference, then the dem preferences.  A preference arc has None in
+        place of s (a dem preference) or t (a rep preference).  'cut_value' is their
+        total, 'flow_value' the maximum flow, and 'optimal' is True when
+        both agree.  'users' maps every user to its 'side', the
+        'preference_cost' of the preference it goes against, the
+        'friend_cost' of its friendships cut, and 'flip_delta', by how much
+        the cut would grow if it alone changed side (never negative).
+        Everything is read off the cut in O(V + E); method, profile and
+        reduce are those of facebook_friend.
+        """
+        prof = profile or NO_PROFILE
+        ids, edges, dems, reps, value, mark = _friend_cut(V, E, method, prof, reduce)
+        n = len(ids)
+        same = [0] * n                 # friendship weight towards the own side
+        other = [0] * n                # friendship weight across the cut
+        crossing = [[] for _ in range(n)]      # cut friendships by dem end
+        for u, v, w in zip(*edges):
+                if u == v:
+                        continue
+                if mark[u] == mark[v]:
+                        same[u] += w
+                        same[v] += w
+                else:
+                        other[u] += w
+                        other[v] += w
+                        if w > 0:
+                                a, b = (v, u) if mark[u] else (u, v)
+                                crossing[a].append((ids.name(a), ids.name(b), w))
+        cut_edges = []
+        for i, x in enumerate(ids):
+                if not mark[i]:
+                        cut_edges.extend(crossing[i])
+                        if reps[i] > 0:
+                                cut_edges.append((x, None, reps[i]))
+        for i, x in enumerate(ids):
+                if mark[i] and dems[i] > 0:
+                        cut_edges.append((None, x, dems[i]))
+        cut = sum(c for a, b, c in cut_edges)
+        cert = {'flow_value': value, 'cut_value': cut, 'cut_edges': cut_edges,
+                'optimal': value == cut}
+        users = {}
+        for i, x in enumerate(ids):
+                cost, flipped = (dems[i], reps[i]) if mark[i] else (reps[i], dems[i])
+                users[x] = {
+                        'side': 'repu' if mark[i] else 'dem',
+                        'preference_cost': cost,
+                        'friend_cost': other[i],
+                        'flip_delta': flipped + same[i] - cost - other[i],
+                }
+        cert['users'] = users
+        cert['dem'] = ids.names(i for i in range(n) if not mark[i])
+        cert['repu'] = ids.names(i for i in range(n) if mark[i])
+        prof.count('users', n)
+        prof.count('edges', len(edges[0]))
+        prof.finish()
+        return cert
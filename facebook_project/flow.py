@@ -0,0 +1,377 @@
+from array import array
+from collections import deque
+from itertools import repeat
+
+class FlowNetwork:
+  """Residual network over vertices 0..n-1 stored as paired arc arrays.
+
+  Arc a runs into _to[a] and _rev[a] is the arc running the other way;
+  _cap holds the current residual capacity of every arc and _orig the
+  capacity it was created with.  _adj[u] lists the arcs leaving u.
+  """
+  __slots__ = '_n', '_adj', '_to', '_rev', '_cap', '_orig'
+
+  def __init__(self, n=0):
+    """Create a network with n isolated vertices."""
+    self._n = n
+    self._adj = [[] for _ in range(n)]
+    self._to = []
+    self._rev = []
+    self._cap = []
+    self._orig = []
+
+  @classmethod
+  def from_rows(cls, offsets, to, rev, cap):
+    """Wrap a compressed-row arc layout as a network without copying it.
+
+    The arcs leaving u are offsets[u] .. offsets[u+1]-1, rev pairs every arc
+    with its reverse and cap is used in place as the residual capacity.
+    """
+    net = cls.__new__(cls)
+    net._n = len(offsets) - 1
+    net._adj = [range(offsets[u], offsets[u+1]) for u in range(net._n)]
+    net._to = to
+    net._rev = rev
+    net._cap = cap
+    net._orig = array(cap.typecode, cap) if isinstance(cap, array) else list(cap)
+    return net
+
+  def vertex_count(self):
+    """Return the number of vertices in the network."""
+    return self._n
+
+  def arc_count(self):
+    """Return the number of arcs, reverse arcs included."""
+    return len(self._to)
+
+  def add_vertex(self):
+    """Append a new vertex and return its index."""
+    self._adj.append([])
+    self._n += 1
+    return self._n - 1
+
+  def add_edge(self, u, v, cap, rcap=0):
+    """Add arc u->v of capacity cap paired with v->u of capacity rcap.
+
+    Return the index of the forward arc.
+    """
+    a = len(self._to)
+    self._to.append(v)
+    self._to.append(u)
+    self._rev.append(a + 1)
+    self._rev.append(a)
+    self._cap.append(cap)
+    self._cap.append(rcap)
+    self._orig.append(cap)
+    self._orig.append(rcap)
+    for x, b in ((u, a), (v, a + 1)):
+      if type(self._adj[x]) is range:    # contiguous row of a CSR layout
+        self._adj[x] = list(self._adj[x])
+      self._adj[x].append(b)
+    return a
+
+  def add_edges(self, sources, targets, caps, rcaps=None):
+    """Add one arc pair per (sources[k], targets[k]) in a single pass.
+
+    Arc k gets capacity caps[k] and its reverse rcaps[k] (0 if rcaps is
+    None).  Nothing is validated: every id must be a vertex already.
+    """
+    adj, to, rev, cap = self._adj, self._to, self._rev, self._cap
+    a = len(to)
+    first = a
+    if rcaps is None:
+      rcaps = repeat(0)
+    for u, v, c, rc in zip(sources, targets, caps, rcaps):
+      to.extend((v, u))                # lists, or arrays after from_rows
+      rev.extend((a + 1, a))
+      cap.extend((c, rc))
+      for x, b in ((u, a), (v, a + 1)):
+        row = adj[x]
+        if type(row) is range:         # contiguous row of a CSR layout
+          row = adj[x] = list(row)
+        row.append(b)
+      a += 2
+    self._orig.extend(cap[first:])
+
+  def reset(self):
+    """Discard any flow, restoring every arc to its original capacity."""
+    self._cap[:] = self._orig
+
+  def flow(self, a):
+    """Return the flow currently carried by arc a."""
+    return self._orig[a] - self._cap[a]
+
+  def sink_side(self, t):
+    """Return a list marking the vertices that can still reach t.
+
+    Computed by a reverse search over arcs with positive residual capacity.
+    """
+    adj, to, rev, cap = self._adj, self._to, self._rev, self._cap
+    mark = [False] * self._n
+    mark[t] = True
+    q = deque([t])
+    while q:
+      v = q.popleft()
+      for a in adj[v]:
+        u = to[a]
+        if not mark[u] and cap[rev[a]] > 0:     # residual arc u->v exists
+          mark[u] = True
+          q.append(u)
+    return mark
+
+def cut_network(n, sources, targets, weights, source_caps, sink_caps):
+  """Return (net, s, t): the s-t network of a two-sided labelling problem.
+
+  Vertices 0..n-1 are the items and s = n, t = n + 1 the terminals.  Edge k
+  joins sources[k] and targets[k] by a pair of arcs of capacity weights[k]
+  (cut whenever its ends are labelled apart); item i is joined to s by an
+  arc of capacity source_caps[i] and to t by one of sink_caps[i].  This is
+  the network Graph.modify builds, written in one pass without validation.
+  """
+  net = FlowNetwork(n + 2)
+  s, t = n, n + 1
+  weights = list(weights)
+  net.add_edges(sources, targets, weights, weights)
+  net.add_edges(repeat(s, n), range(n), source_caps)
+  net.add_edges(range(n), repeat(t, n), sink_caps)
+  return net, s, t
+
+#------------------------- max-flow algorithms -------------------------
+def _levels(adj, to, cap, n, s, t):
+  """Breadth-first layering of the residual network from s."""
+  level = [-1] * n
+  level[s] = 0
+  q = deque([s])
+  while q:
+    u = q.popleft()
+    nxt = level[u] + 1
+    for a in adj[u]:
+      v = to[a]
+      if level[v] < 0 and cap[a] > 0:
+        level[v] = nxt
+        if v == t:
+          return level
+        q.append(v)
+  return level
+
+def _blocking_flow(adj, to, rev, cap, level, s, t, limit=None, stats=None):
+  """Saturate the level graph with an iterative current-arc search.
+
+  Stop early once limit units have been pushed, if a limit is given.  If
+  stats is a list, the augmenting paths used and the arcs scanned are added
+  to stats[0] and stats[1].
+  """
+  it = [0] * len(adj)
+  path = []
+  total = 0
+  paths = 0
+  u = s
+  while True:
+    if u == t:
+      f = min(cap[a] for a in path)
+      if limit is not None and f > limit - total:
+        f = limit - total
+      for a in path:
+        cap[a] -= f
+        cap[rev[a]] += f
+      total += f
+      paths += 1
+      if total == limit:
+        break
+      for k, a in enumerate(path):     # retreat to the first saturated arc
+        if cap[a] == 0:
+          del path[k:]
+          break
+      u = to[path[-1]] if path else s
+      continue
+    au = adj[u]
+    want = level[u] + 1
+    i = it[u]
+    while i < len(au):
+      a = au[i]
+      if cap[a] > 0 and level[to[a]] == want:
+        break
+      i += 1
+    it[u] = i
+    if i < len(au):
+      path.append(au[i])
+      u = to[au[i]]
+    else:
+      if u == s:
+        break
+      level[u] = -1                    # dead end, never enter it again
+      a = path.pop()
+      u = to[rev[a]]
+      it[u] += 1
+  if stats is not None:
+    stats[0] += paths
+    stats[1] += sum(it)
+  return total
+
+def dinic(net, s, t, profile=None):
+  """Push a maximum s-t flow through net with Dinic's algorithm.
+
+  Return the value of the flow; net is left holding its residual network.
+  The network may already carry a flow, which is then increased.
+  """
+  return augment(net, s, t, profile=profile)
+
+def augment(net, s, t, limit=None, profile=None):
+  """Push up to limit more units from s to t along residual paths.
+
+  With no limit the flow is made maximum.  Return the amount pushed.  A
+  Profile, if given, counts the 'bfs_rounds', the 'augmentations' and the
+  'arcs_scanned' by the blocking flows.
+  """
+  if s == t:
+    raise ValueError('source and sink must differ')
+  adj, to, rev, cap, n = net._adj, net._to, net._rev, net._cap, net._n
+  stats = None if profile is None else [0, 0]
+  rounds = 0
+  flow = 0
+  while limit is None or flow < limit:
+    level = _levels(adj, to, cap, n, s, t)
+    if level[t] < 0:
+      break
+    rounds += 1
+    flow += _blocking_flow(adj, to, rev, cap, level, s, t,
+                           None if limit is None else limit - flow, stats)
+  if profile is not None:
+    profile.count('bfs_rounds', rounds)
+    profile.count('augmentations', stats[0])
+    profile.count('arcs_scanned', stats[1])
+  return flow
+
+def _exact_labels(adj, to, rev, cap, n, s, t):
+  """Return exact residual distances to t; unreachable vertices get n."""
+  d = [n] * n
+  d[t] = 0
+  q = deque([t])
+  while q:
+    v = q.popleft()
+    nxt = d[v] + 1
+    for a in adj[v]:
+      u = to[a]
+      if d[u] == n and u != s and cap[rev[a]] > 0:
+        d[u] = nxt
+        q.append(u)
+  return d
+
+def push_relabel(net, s, t, relabel_freq=1.0, profile=None):
+  """Push a maximum s-t preflow through net by highest-label push-relabel.
+
+  Uses the gap heuristic and a global relabeling (exact distances to t)
+  after every relabel_freq * n relabel operations.  Only the first phase is
+  run: the value returned is the maximum flow value, and the residual
+  network identifies the same minimum cut as a full maximum flow.  A
+  Profile, if given, counts the 'relabels', 'gaps' and 'global_relabels'.
+  """
+  if s == t:
+    raise ValueError('source and sink must differ')
+  adj, to, rev, cap, n = net._adj, net._to, net._rev, net._cap, net._n
+  excess = [0] * n
+  for a in adj[s]:                     # saturate every arc leaving s
+    c = cap[a]
+    if c > 0:
+      cap[a] = 0
+      cap[rev[a]] += c
+      excess[to[a]] += c
+  it = [0] * n
+  threshold = max(1, int(relabel_freq * n))
+  relabels = gaps = rounds = 0
+  while True:
+    rounds += 1
+    # global relabeling: rebuild labels, label members and active buckets
+    d = _exact_labels(adj, to, rev, cap, n, s, t)
+    members = [set() for _ in range(n)]
+    active = [[] for _ in range(n)]
+    highest = 0
+    top = 0                            # no label above top has members
+    for v in range(n):
+      if d[v] < n:
+        members[d[v]].add(v)
+        if d[v] > top:
+          top = d[v]
+        if excess[v] > 0 and v != t:
+          active[d[v]].append(v)
+          if d[v] > highest:
+            highest = d[v]
+    work = 0
+    while highest > 0 and work < threshold:
+      bucket = active[highest]
+      if not bucket:
+        highest -= 1
+        continue
+      u = bucket.pop()
+      if d[u] != highest or excess[u] == 0:
+        continue                       # stale entry
+      au = adj[u]
+      du = d[u]
+      while excess[u] > 0:
+        i = it[u]
+        if i == len(au):
+          # relabel u
+          work += 1
+          newd = n
+          for a in au:
+            if cap[a] > 0 and d[to[a]] + 1 < newd:
+              newd = d[to[a]] + 1
+          members[du].discard(u)
+          if not members[du]:
+            # gap: nothing above du can reach t any more
+            gaps += 1
+            for k in range(du + 1, top + 1):
+              for v in members[k]:
+                d[v] = n
+              members[k].clear()
+            top = du - 1
+            newd = n
+          d[u] = du = newd
+          it[u] = 0
+          if du >= n:
+            break
+          members[du].add(u)
+          if du > top:
+            top = du
+          continue
+        a = au[i]
+        v = to[a]
+        if cap[a] > 0 and du == d[v] + 1:
+          delta = excess[u] if excess[u] < cap[a] else cap[a]
+          cap[a] -= delta
+          cap[rev[a]] += delta
+          excess[u] -= delta
+          if excess[v] == 0 and v != t and v != s:
+            active[d[v]].append(v)
+            if d[v] > highest:
+              highest = d[v]
+          excess[v] += delta
+          if cap[a] == 0:
+            it[u] = i + 1
+        else:
+          it[u] = i + 1
+    relabels += work
+    if work < threshold:
+      break
+    it = [0] * n
+  if profile is not None:
+    profile.count('relabels', relabels)
+    profile.count('gaps', gaps)
+    profile.count('global_relabels', rounds)
+  return excess[t]
+
+METHODS = {
+  'dinic': dinic,
+  'push_relabel': push_relabel,
+}
+
+def max_flow(net, s, t, method='dinic', profile=None):
+  """Push a maximum s-t flow through net with the named algorithm.
+
+  profile, if given, is a Profile collecting the counters of the backend.
+  """
+  try:
+    solve = METHODS[method]
+  except KeyError:
+    raise ValueError('unknown max-flow method: {0}'.format(method)) from None
+  return solve(net, s, t, profile=profile)
@@ -20,7 +20,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from collections import defaultdict
 from collections import OrderedDict
+from heapq import heappush, heappop
 from store_for_pathAll import *
+from flow import FlowNetwork, max_flow
+from instrument import NO_PROFILE
 class Graph:
   """Representation of a simple graph using an adjacency map."""
   #------------------------- nested Vertex class -------------------------
@@ -36,8 +39,8 @@ class Graph:
       """Return element associated with this vertex."""
       return self._element
 
-    def __hash__(self):         # will allow vertex to be a map/set key
-      return hash(id(self))
+    # will allow vertex to be a map/set key; identity hashing, done in C
+    __hash__ = object.__hash__
 
     def __str__(self):
       return str(self._element)
@@ -71,8 +74,8 @@ class Graph:
       """Return element associated with this edge."""
       return self._element
 
-    def __hash__(self):         # will allow edge to be a map/set key
-      return hash( (self._origin, self._destination) )
+    # will allow edge to be a map/set key; identity hashing, done in C
+    __hash__ = object.__hash__
 
     def __str__(self):
       return '({0},{1},{2})'.format(self._origin,self._destination,self._element)
@@ -172,12 +175,22 @@ class Graph:
     self.graph[u].append(v)
 
 
-  def BFS(self,s,d, q = MyQUEUE()):
+  def BFS(self,s,d, q = None, profile = None):
+    """Append every simple s-d path to self.pathAll, shortest first.
+
+    A Profile, if given, counts the 'paths_enumerated', the 'edges_touched'
+    and the 'queue_high_water' mark of the traversal.
+    """
+    if q is None:
+      q = MyQUEUE()                 # fresh queue for every traversal
     temp_path = [s]
 
     q.enqueue(temp_path)
+    found = touched = high = 0
 
     while q.IsEmpty() == False:
+        if profile is not None and len(q) > high:
+          high = len(q)
         tmp_path = q.dequeue()
         last_node = tmp_path[len(tmp_path)-1]
         if last_node == d:
@@ -189,81 +202,215 @@ class Graph:
               break
             n += 1
           self.pathAll.append(path.copy())
+          found += 1
+        touched += len(self.graph[last_node])
         for link_node in self.graph[last_node]:
             if link_node not in tmp_path:
                 new_path = []
                 new_path = tmp_path + [link_node]
                 q.enqueue(new_path)
-
-  def getAllPaths(self, s, d):
-          visited = {}
-          
-          for vertex in self.vertices():
-            visited[vertex] = False
-              
-          self.BFS(s, d)
+    if profile is not None:
+      profile.count('paths_enumerated', found)
+      profile.count('edges_touched', touched)
+      profile.high_water('queue_high_water', high)
+
+  def iter_paths(self, s, d, max_paths=None, max_length=None, profile=None):
+    """Generate the simple s-d paths, as lists of edges, shortest first.
+
+    Paths come in the order BFS finds them.  A partial path is a node
+    (vertex, parent node, length) sharing its prefix with its parent, so
+    no path is copied until it reaches d.  At most max_paths paths are
+    generated and paths longer than max_length edges are not explored.  A
+    Profile, if given, gets the counters BFS reports.
+    """
+    self._validate_vertex(s)
+    self._validate_vertex(d)
+    outgoing = self._outgoing
+    q = MyQUEUE()
+    q.enqueue((s, None, 0))
+    found = touched = high = 0
+    try:
+      while q.IsEmpty() == False:
+        if profile is not None and len(q) > high:
+          high = len(q)
+        node = q.dequeue()
+        v, parent, length = node
+        if v is d:
+          path = []
+          while parent is not None:
+            u = parent[0]
+            path.append(outgoing[u][v])
+            v, parent = u, parent[1]
+          path.reverse()
+          found += 1
+          yield path
+          if found == max_paths:
+            return
+          continue                     # a simple path cannot come back to d
+        if length == max_length:
+          continue
+        touched += len(self.graph[v])
+        for w in self.graph[v]:
+          a = node
+          while a is not None and a[0] is not w:
+            a = a[1]
+          if a is None:
+            q.enqueue((w, node, length + 1))
+    finally:
+      if profile is not None:
+        profile.count('paths_enumerated', found)
+        profile.count('edges_touched', touched)
+        profile.high_water('queue_high_water', high)
+
+  def _shortest_path(self, s, d, weighted, skip_vertices=(), skip_edges=()):
+    """Return (cost, vertices, edges) of a shortest s-d path, or None.
+
+    Dijkstra's algorithm, with edge elements as lengths if weighted and
+    unit lengths otherwise; skip_vertices and skip_edges are avoided.
+    """
+    dist = {s: 0}
+    prev = {}
+    done = set()
+    heap = [(0, 0, s)]
+    tie = 1
+    while heap:
+      du, _, u = heappop(heap)
+      if u is d:
+        break
+      if u in done:
+        continue
+      done.add(u)
+      for v, e in self._outgoing[u].items():
+        if v in done or v in skip_vertices or e in skip_edges:
+          continue
+        dv = du + (e._element if weighted else 1)
+        if v not in dist or dv < dist[v]:
+          dist[v] = dv
+          prev[v] = (u, e)
+          heappush(heap, (dv, tie, v))
+          tie += 1
+    else:
+      if s is not d:
+        return None
+    vertices = [d]
+    edges = []
+    v = d
+    while v is not s:
+      v, e = prev[v]
+      vertices.append(v)
+      edges.append(e)
+    vertices.reverse()
+    edges.reverse()
+    return dist[d], vertices, edges
+
+  def k_shortest_paths(self, s, d, k, weighted=False):
+    """Return up to k simple s-d paths, as lists of edges, shortest first.
+
+    Yen's algorithm: paths are ranked by number of edges, or by the sum of
+    their edge elements if weighted is True (elements must not be
+    negative); ties go to the path found first.  Each new path costs one
+    Dijkstra search per vertex of the previous one, independently of how
+    many s-d paths the graph has.
+    """
+    self._validate_vertex(s)
+    self._validate_vertex(d)
+    first = self._shortest_path(s, d, weighted)
+    if first is None or k <= 0:
+      return []
+    found = [first]
+    seen = {tuple(first[2])}
+    candidates = []
+    tie = 0
+    while len(found) < k:
+      cost, vertices, edges = found[-1]
+      root_cost = 0
+      for j in range(len(edges)):
+        root = vertices[:j + 1]
+        skip_edges = {p[2][j] for p in found
+                      if len(p[2]) > j and all(x is y for x, y in zip(p[1], root))}
+        spur = self._shortest_path(vertices[j], d, weighted, set(root[:-1]), skip_edges)
+        if spur is not None:
+          path = edges[:j] + spur[2]
+          key = tuple(path)
+          if key not in seen:
+            seen.add(key)
+            heappush(candidates, (root_cost + spur[0], tie, root[:-1] + spur[1], path))
+            tie += 1
+        root_cost += edges[j]._element if weighted else 1
+      if not candidates:
+        break
+      cost, _, vertices, edges = heappop(candidates)
+      found.append((cost, vertices, edges))
+    return [edges for cost, vertices, edges in found]
+
+  def getAllPaths(self, s, d, profile = None):
+          """Return (order, paths): every simple s-d path, shortest first.
+
+          paths maps 0, 1, ... to the edge lists of the paths and order lists
+          those keys by increasing length.  Paths are not kept in pathAll.
+          """
           t = dict()
-          l = list()
-          count = 0
-          for path in self.pathAll:
-            for v in path:
-              l.append(v)
-              if v._destination == d:
-                t[count] = l.copy()
-                l.clear()
-                count += 1
-          list_ordered = []
-          for k in sorted(t,key = lambda k: len(t[k])):
-            list_ordered.append(k)
+          with (profile or NO_PROFILE).phase('getAllPaths'):
+            for count, path in enumerate(self.iter_paths(s, d, profile=profile)):
+              t[count] = path
+          list_ordered = list(t)
           return list_ordered, t
 
-  def minAllPath(self, order,paths):
+  def minAllPath(self, order,paths, profile = None):
     list_depth = []
     flow = 0
     l = []
+    augmentations = touched = 0
     for x in order:
       for ele in paths[x]:
         l.append(ele._element)
+      touched += len(l)
       mini = min(l)
       flow +=mini
       l.clear()
       if (mini > 0):
+        augmentations += 1
         for ele in paths[x]:
           ele._element -= mini
           if (ele._element == 0):
             list_depth.append(ele)
+    if profile is not None:
+      profile.count('augmentations', augmentations)
+      profile.count('edges_touched', touched)
     return list_depth
 
-  def maxFlow(self, order, paths, s, d, dem = [], repu = []) :
-    list_depth = self.minAllPath(order,paths)
+  def maxFlow(self, order, paths, s, d, dem = [], repu = [], profile = None) :
+    with (profile or NO_PROFILE).phase('minAllPath'):
+      list_depth = self.minAllPath(order,paths, profile)
     dem.append(s)
     repu.append(d)
     check = False
     node_for_insert = []
-    for x in sorted(paths,key = lambda x: len(paths[x]), reverse=True):
-      for ele in paths[x]:
-        if(list_depth.__contains__(ele) and check == False):
-          list_depth.remove(ele)
-          if(not dem.__contains__(ele._origin._element) and not repu.__contains__(ele._origin._element)):
-            dem.append(ele._origin._element)
-          if(ele._destination._element != d):
-            if (not repu.__contains__(ele._destination._element) and not dem.__contains__(ele._destination._element)):
-              repu.append(ele._destination._element)
-          check = True
-        else:
-          if (check == True):
-            if (not repu.__contains__(ele._origin._element) and not dem.__contains__(ele._origin._element)):
-              repu.append(ele._origin._element)
-            if (not repu.__contains__(ele._destination._element) and not  dem.__contains__(ele._destination._element)):
-              repu.append(ele._destination._element)
+    with (profile or NO_PROFILE).phase('maxFlow'):
+      for x in sorted(paths,key = lambda x: len(paths[x]), reverse=True):
+        for ele in paths[x]:
+          if(list_depth.__contains__(ele) and check == False):
+            list_depth.remove(ele)
+            if(not dem.__contains__(ele._origin._element) and not repu.__contains__(ele._origin._element)):
+              dem.append(ele._origin._element)
+            if(ele._destination._element != d):
+              if (not repu.__contains__(ele._destination._element) and not dem.__contains__(ele._destination._element)):
+                repu.append(ele._destination._element)
+            check = True
           else:
-            node_for_insert.append(ele)
-      for i in node_for_insert:
-        if (not dem.__contains__(i._origin._element) and not repu.__contains__(i._origin._element)):
-          dem.append(i._origin._element)
-        if (not dem.__contains__(i._destination._element) and not repu.__contains__(i._destination._element)):
-          dem.append(i._destination._element)
-      check = False
+            if (check == True):
+              if (not repu.__contains__(ele._origin._element) and not dem.__contains__(ele._origin._element)):
+                repu.append(ele._origin._element)
+              if (not repu.__contains__(ele._destination._element) and not  dem.__contains__(ele._destination._element)):
+                repu.append(ele._destination._element)
+            else:
+              node_for_insert.append(ele)
+        for i in node_for_insert:
+          if (not dem.__contains__(i._origin._element) and not repu.__contains__(i._origin._element)):
+            dem.append(i._origin._element)
+          if (not dem.__contains__(i._destination._element) and not repu.__contains__(i._destination._element)):
+            dem.append(i._destination._element)
+        check = False
     return dem, repu
 
   def minCut(self,order, paths, s, d, dem = [], repu = []) :
@@ -296,19 +443,78 @@ class Graph:
         dem.append(i._destination._element)
     return dem,repu
 
-  def modify(self,y,V):
-    for arc in self.edges():
-      self.insert_edge(arc._destination,arc._origin,arc._element)
-    y['s'] = self.insert_vertex('s')
-    y['t'] = self.insert_vertex('t')
-    for key in V:
-      if(y[key] is not y['s'] and y[key] is not y['t']):
-        self.insert_edge(y['s'],y[key],V[key][0])
-        self.insert_edge(y[key],y['t'],V[key][1])
-
-
-
-
+  def network(self):
+    """Return (net, index): a FlowNetwork copy of the graph and its vertex map.
 
+    index maps every Vertex to its integer id in net; edge elements are used
+    as arc capacities.
+    """
+    index = {}
+    for v in self._outgoing:
+      index[v] = len(index)
+    net = FlowNetwork(len(index))
+    for u, secondary_map in self._outgoing.items():
+      for v, e in secondary_map.items():
+        net.add_edge(index[u], index[v], e._element)
+    return net, index
+
+  def maxFlowCut(self, s, d, method='dinic', profile=None):
+    """Return (dem, repu): elements on the s side and d side of a minimum cut.
+
+    The cut comes from a maximum flow computed in polynomial time, rather
+    than from the enumeration of every s-d path.  The terminals themselves
+    are not reported.  method names the max-flow backend ('dinic' or
+    'push_relabel'); every backend yields the same cut.  profile, if given,
+    times the 'network', 'max_flow' and 'cut' phases.
+    """
+    self._validate_vertex(s)
+    self._validate_vertex(d)
+    with (profile or NO_PROFILE).phase('network'):
+      net, index = self.network()
+    with (profile or NO_PROFILE).phase('max_flow'):
+      max_flow(net, index[s], index[d], method, profile)
+    with (profile or NO_PROFILE).phase('cut'):
+      mark = net.sink_side(index[d])
+    dem = []
+    repu = []
+    for v, i in index.items():
+      if v is s or v is d:
+        continue
+      if mark[i]:
+        repu.append(v._element)
+      else:
+        dem.append(v._element)
+    return dem, repu
 
+  def modify(self,y,V, profile = None):
+    """Turn the graph into the s-t network of facebook_friend, in one pass.
 
+    Every edge gets a reverse of the same weight, and new vertices y['s']
+    and y['t'] are joined to every user of V by arcs of its two preferences.
+    Arcs are written straight into the adjacency maps, without validation.
+    The work is timed as the 'modify' phase of profile, if one is given.
+    """
+    with (profile or NO_PROFILE).phase('modify'):
+      outgoing, incoming = self._outgoing, self._incoming
+      reverse = [(e._destination, e._origin, e._element)
+                 for secondary_map in outgoing.values() for e in secondary_map.values()]
+      for u, v, x in reverse:
+        if v in outgoing[u]:
+          raise ValueError('u and v are already adjacent')
+        e = self.Edge(u, v, x)
+        outgoing[u][v] = e
+        incoming[v][u] = e
+        self.graph[u].append(v)
+      s = y['s'] = self.insert_vertex('s')
+      t = y['t'] = self.insert_vertex('t')
+      for key in V:
+        u = y[key]
+        if u is not s and u is not t:
+          e = self.Edge(s, u, V[key][0])
+          outgoing[s][u] = e
+          incoming[u][s] = e
+          self.graph[s].append(u)
+          e = self.Edge(u, t, V[key][1])
+          outgoing[u][t] = e
+          incoming[t][u] = e
+          self.graph[u].append(t)
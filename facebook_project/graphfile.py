@@ -0,0 +1,166 @@
+import mmap
+import struct
+import sys
+from array import array
+from csr import CSRGraph
+from reader import scan_graph1, scan_graph2
+
+# File layout (every integer is a native int64 in the byte order recorded
+# in the header):
+#
+#   header        magic, byte order, flags, n, m, size of the name blob
+#   name offsets  n + 1 entries into the name blob
+#   dem, rep      n entries each, present only if flags & HAS_PREFERENCES
+#   sources       m entries
+#   targets       m entries
+#   weights       m entries
+#   name blob     the UTF-8 encoded names, back to back
+MAGIC = b'FBGRAPH1'
+HEADER = struct.Struct('=8s2sB5xqqq')
+HAS_PREFERENCES = 1
+_ORDER = b'le' if sys.byteorder == 'little' else b'be'
+
+def write_graph(filename, names, sources, targets, weights, dem=None, rep=None):
+  """Write a graph in binary form.
+
+  names[i] is the name of vertex i; edge k runs from sources[k] to
+  targets[k] with weight weights[k].  dem and rep optionally hold the
+  per-vertex preferences of a read_graph2 input.
+  """
+  blob = [str(x).encode() for x in names]
+  offsets = array('q', [0])
+  for b in blob:
+    offsets.append(offsets[-1] + len(b))
+  flags = HAS_PREFERENCES if dem is not None else 0
+  with open(filename, 'wb') as outfile:
+    outfile.write(HEADER.pack(MAGIC, _ORDER, flags, len(names), len(sources), offsets[-1]))
+    outfile.write(offsets)
+    if flags & HAS_PREFERENCES:
+      outfile.write(array('q', dem))
+      outfile.write(array('q', rep))
+    for column in (sources, targets, weights):
+      outfile.write(array('q', column))
+    outfile.write(b''.join(blob))
+
+def convert(textfile, binfile, fmt=1):
+  """Convert a read_graph1 (fmt=1) or read_graph2 (fmt=2) text file."""
+  if fmt == 1:
+    names, sources, targets, weights = scan_graph1(textfile)
+    write_graph(binfile, names, sources, targets, weights)
+  elif fmt == 2:
+    names, dem, rep, sources, targets, weights = scan_graph2(textfile)
+    write_graph(binfile, names, sources, targets, weights, dem, rep)
+  else:
+    raise ValueError('fmt must be 1 or 2')
+
+class NameTable:
+  """Read-only sequence of the vertex names, decoded on access."""
+  __slots__ = '_offsets', '_blob'
+
+  def __init__(self, offsets, blob):
+    self._offsets = offsets
+    self._blob = blob
+
+  def __len__(self):
+    return len(self._offsets) - 1
+
+  def __getitem__(self, i):
+    if i < 0:
+      i += len(self)
+    if not 0 <= i < len(self):
+      raise IndexError('name index out of range')
+    return str(self._blob[self._offsets[i]:self._offsets[i+1]], 'utf-8')
+
+  def __iter__(self):
+    for i in range(len(self)):
+      yield self[i]
+
+class GraphFile:
+  """A binary graph file mapped into memory.
+
+  Every column (sources, targets, weights, dem, rep) is an int64 memoryview
+  over the mapped file, so opening costs no per-edge work.  Use as a
+  context manager, or call close() once the views are no longer needed.
+  """
+
+  def __init__(self, filename):
+    self._file = open(filename, 'rb')
+    try:
+      self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:                   # an empty file cannot be mapped
+      self._file.close()
+      raise ValueError('not a binary graph file: {0}'.format(filename)) from None
+    self._views = []
+    try:
+      self._open(filename)
+    except Exception:
+      self.close()
+      raise
+
+  def _open(self, filename):
+    if len(self._map) < HEADER.size:
+      raise ValueError('not a binary graph file: {0}'.format(filename))
+    magic, order, flags, n, m, nbytes = HEADER.unpack_from(self._map)
+    if magic != MAGIC:
+      raise ValueError('not a binary graph file: {0}'.format(filename))
+    if order != _ORDER:
+      raise ValueError('graph file was written with the other byte order')
+    columns = 2 if flags & HAS_PREFERENCES else 0
+    size = HEADER.size + 8 * (n + 1 + columns * n + 3 * m) + nbytes
+    if len(self._map) != size:
+      raise ValueError('truncated graph file: {0}'.format(filename))
+    raw = memoryview(self._map)
+    self._views.append(raw)
+    at = HEADER.size
+    def column(length):
+      nonlocal at
+      view = raw[at:at + 8 * length].cast('q')
+      self._views.append(view)
+      at += 8 * length
+      return view
+    offsets = column(n + 1)
+    self.dem = column(n) if columns else None
+    self.rep = column(n) if columns else None
+    self.sources = column(m)
+    self.targets = column(m)
+    self.weights = column(m)
+    blob = raw[at:at + nbytes]
+    self._views.append(blob)
+    self.names = NameTable(offsets, blob)
+
+  def vertex_count(self):
+    """Return the number of vertices."""
+    return len(self.names)
+
+  def edge_count(self):
+    """Return the number of edges."""
+    return len(self.sources)
+
+  def csr(self):
+    """Return the CSRGraph of the file (undirected, preferences included)."""
+    dem = rep = None
+    if self.dem is not None:
+      dem = array('q', self.dem)       # the graph must outlive the mapping
+      rep = array('q', self.rep)
+    return CSRGraph.from_arrays(list(self.names), self.sources, self.targets,
+                                self.weights, dem, rep)
+
+  def close(self):
+    """Release the mapping; views obtained from this file become invalid."""
+    for view in reversed(self._views):
+      view.release()
+    self._views = []
+    self.names = self.sources = self.targets = self.weights = None
+    self.dem = self.rep = None
+    self._map.close()
+    self._file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+if __name__ == '__main__':
+  # usage: python graphfile.py graph2.txt graph2.bin 2
+  convert(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 1)
@@ -0,0 +1,309 @@
+from flow import FlowNetwork, augment
+from interning import Interner
+from maxcut import REP, greedy_sides
+
+class FriendSolver:
+  """facebook_friend that keeps its residual network between solves.
+
+  The network is the one Graph.modify builds: s->user arcs carry the dem
+  preference, user->t arcs the rep preference and every friendship is a
+  pair of arcs of its weight.  After a change of preferences or weights the
+  current maximum flow is repaired instead of being recomputed, and
+  solve() then only pushes the flow the change made possible.
+  """
+
+  def __init__(self, V, E):
+    """Build the network of the (V, E) input of facebook_friend."""
+    self._ids = Interner()
+    self._pref = []                    # user -> (s->user arc, user->t arc)
+    self._edges = {}                   # (u, v), u < v -> friendship arc
+    self._net = FlowNetwork(2)
+    self._s = 0
+    self._t = 1
+    for x in V:
+      self.set_preference(x, V[x][0], V[x][1])
+    for (a, b), w in E.items():
+      if a not in self._ids or b not in self._ids:
+        raise ValueError('the arc in E is not present in V.')
+      self.set_edge(a, b, self.edge_weight(a, b) + w)
+
+  #------------------------- accessors -------------------------
+  def users(self):
+    """Return the list of users, in order of insertion."""
+    return self._ids.names()
+
+  def edge_weight(self, a, b):
+    """Return the weight of the friendship between a and b (0 if none)."""
+    arc = self._edges.get(self._key(a, b))
+    return 0 if arc is None else self._net._orig[arc]
+
+  def flow_value(self):
+    """Return the value of the current flow, i.e. of the last cut."""
+    net = self._net
+    return sum(net.flow(a) for a in net._adj[self._s])
+
+  def _key(self, a, b):
+    u = self._ids.id(a)
+    v = self._ids.id(b)
+    return (u, v) if u < v else (v, u)
+
+  #------------------------- deltas -------------------------
+  def set_preference(self, x, dem, rep):
+    """Set the (dem, rep) preference of user x, adding x if it is new."""
+    i = self._ids.get(x)
+    if i is None:
+      net = self._net
+      self._ids.intern(x)
+      u = net.add_vertex()
+      self._pref.append((net.add_edge(self._s, u, dem), net.add_edge(u, self._t, rep)))
+      return
+    a, b = self._pref[i]
+    self._set_capacity(a, dem)
+    self._set_capacity(b, rep)
+
+  def set_edge(self, a, b, w):
+    """Set the weight of the friendship between users a and b.
+
+    The pair is unordered; a weight of 0 removes the friendship.
+    """
+    if a == b:
+      return                           # a loop never crosses a cut
+    key = self._key(a, b)
+    arc = self._edges.get(key)
+    if arc is None:
+      if w:
+        u, v = key
+        self._edges[key] = self._net.add_edge(self._vertex(u), self._vertex(v), w, w)
+      return
+    self._set_capacity(arc, w)
+    self._set_capacity(self._net._rev[arc], w)
+
+  def update(self, V=None, E=None):
+    """Apply many deltas: V maps users to new preferences, E pairs to weights."""
+    for x, (dem, rep) in (V or {}).items():
+      self.set_preference(x, dem, rep)
+    for (a, b), w in (E or {}).items():
+      self.set_edge(a, b, w)
+
+  def _vertex(self, i):
+    """Return the network vertex of user i."""
+    return i + 2
+
+  def _set_capacity(self, a, c):
+    """Give arc a capacity c, keeping the flow feasible.
+
+    If a carries more than c, the surplus is first rerouted around a and
+    otherwise returned to s and t, which lowers the flow value.
+    """
+    net = self._net
+    cap, orig, rev, to = net._cap, net._orig, net._rev, net._to
+    f = orig[a] - cap[a]
+    orig[a] = c
+    if f <= c:
+      cap[a] = c - f
+      return
+    # clamp the flow on a to c: its tail gains an excess, its head a deficit
+    x = f - c
+    cap[a] = 0
+    cap[rev[a]] -= x
+    u, v = to[rev[a]], to[a]
+    x -= augment(net, u, v, x)
+    if x:
+      if u != self._s:
+        augment(net, u, self._s, x)
+      if v != self._t:
+        augment(net, self._t, v, x)
+
+  #------------------------- solving -------------------------
+  def solve(self):
+    """Return (dem, repu) for the current input, as facebook_friend does."""
+    net = self._net
+    augment(net, self._s, self._t)
+    mark = net.sink_side(self._t)
+    dem = []
+    repu = []
+    for i, x in enumerate(self._ids):
+      if mark[self._vertex(i)]:
+        repu.append(x)
+      else:
+        dem.append(x)
+    return dem, repu
+
+class EnemyPartitioner:
+  """facebook_enmy partition maintained under a stream of edge updates.
+
+  Every user keeps its side and its gain, the weight it has towards its own
+  side minus the weight towards the other one.  An update changes the
+  gains of its two endpoints only, then a local repair flips users with a
+  positive gain (each flip enlarges the cut and costs O(degree)) until none
+  is left or max_flips flips have been made.  Users are interned to ids on
+  arrival and only users with at least one enemy are part of the partition.
+  """
+
+  def __init__(self, V=None, E=None, max_flips=16):
+    """Start from the facebook_enmy partition of (V, E), if given."""
+    self._ids = Interner()
+    self._adj = []                     # id -> {neighbour id: weight}
+    self._side = bytearray()           # id -> 0 (d) or 1 (r)
+    self._gain = []
+    self._users = 0
+    self._edges = 0
+    self._cut = 0
+    self._total = 0
+    self._flips = 0
+    self._updates = 0
+    self.max_flips = max_flips
+    if E:
+      ids = self._ids
+      for x in (V if V is not None else (x for e in E for x in e)):
+        ids.intern(x)
+      try:
+        sources, targets, weights = ids.edges(E)
+      except KeyError:
+        raise Exception('the arc in E is not present in V.') from None
+      self._grow()
+      for i, code in enumerate(greedy_sides(len(ids), sources, targets, weights)):
+        self._side[i] = code >= REP
+      for u, v, w in zip(sources, targets, weights):
+        if u != v:
+          self._set(u, v, self._adj[u].get(v, 0) + w, False)
+      self.repair([i for i in range(len(ids)) if self._adj[i]])
+
+  def _grow(self):
+    """Make room for the users interned since the last call."""
+    for _ in range(len(self._adj), len(self._ids)):
+      self._adj.append({})
+      self._side.append(1)
+      self._gain.append(0)
+
+  #------------------------- queries -------------------------
+  def edge_weight(self, a, b):
+    """Return the weight of the enmity between a and b (0 if none)."""
+    u = self._ids.get(a)
+    v = self._ids.get(b)
+    if u is None or v is None:
+      return 0
+    return self._adj[u].get(v, 0)
+
+  def side(self, x):
+    """Return 'd' or 'r', the side of user x."""
+    return 'r' if self._side[self._ids.id(x)] else 'd'
+
+  def gain(self, x):
+    """Return how much the cut would grow if user x changed side."""
+    return self._gain[self._ids.id(x)]
+
+  def partition(self):
+    """Return (d, r), the sets of users as facebook_enmy returns them."""
+    d = set()
+    r = set()
+    for i, x in enumerate(self._ids):
+      if self._adj[i]:
+        (r if self._side[i] else d).add(x)
+    return d, r
+
+  def stats(self):
+    """Return a dict describing the current cut and the work done so far."""
+    return {
+      'users': self._users,
+      'edges': self._edges,
+      'cut_weight': self._cut,
+      'total_weight': self._total,
+      'cut_fraction': self._cut / self._total if self._total else 1.0,
+      'updates': self._updates,
+      'flips': self._flips,
+    }
+
+  #------------------------- updates -------------------------
+  def set_edge(self, a, b, w):
+    """Set the weight of the enmity between a and b, then repair locally.
+
+    The pair is unordered; a weight of 0 removes the edge.
+    """
+    self._updates += 1
+    if a == b or (not w and not self.edge_weight(a, b)):
+      return                           # a loop never crosses a cut
+    u = self._ids.intern(a)
+    v = self._ids.intern(b)
+    self._grow()
+    self._set(u, v, w)
+    self.repair([u, v])
+
+  def add_edge(self, a, b, w):
+    """Add w to the weight of the enmity between a and b."""
+    self.set_edge(a, b, self.edge_weight(a, b) + w)
+
+  def remove_edge(self, a, b):
+    """Remove the enmity between a and b."""
+    self.set_edge(a, b, 0)
+
+  def _set(self, u, v, w, place=True):
+    """Change the weight of edge (u, v), updating the gains and the cut.
+
+    If place is True a user joining the graph goes opposite to the
+    neighbour it arrives with; of two new users u goes in r and v in d,
+    as in facebook_enmy's greedy.
+    """
+    adj, side, gain = self._adj, self._side, self._gain
+    old = adj[u].get(v, 0)
+    if w == old:
+      return
+    new_u = not adj[u]
+    new_v = not adj[v]
+    for x, new in ((u, new_u), (v, new_v)):
+      if new:
+        self._users += 1
+        gain[x] = 0
+    if place:                          # two new users: u in r, v in d
+      if new_u:
+        side[u] = 1 if new_v else 1 - side[v]
+      if new_v:
+        side[v] = 1 - side[u]
+    delta = w - old
+    self._total += delta
+    if side[u] == side[v]:
+      gain[u] += delta
+      gain[v] += delta
+    else:
+      gain[u] -= delta
+      gain[v] -= delta
+      self._cut += delta
+    if not old:
+      self._edges += 1
+    elif not w:
+      self._edges -= 1
+    for x, y in ((u, v), (v, u)):
+      if w:
+        adj[x][y] = w
+      else:
+        del adj[x][y]
+        if not adj[x]:                 # x has left the graph
+          self._users -= 1
+
+  def _flip(self, x):
+    """Move x to the other side in O(degree)."""
+    gain, side = self._gain, self._side
+    g = gain[x]
+    self._cut += g
+    gain[x] = -g
+    sx = side[x] = 1 - side[x]
+    for y, w in self._adj[x].items():
+      gain[y] += 2 * w if side[y] == sx else -2 * w
+    self._flips += 1
+
+  def repair(self, ids):
+    """Flip users with a positive gain, starting from the given user ids.
+
+    The neighbours of a flipped user are examined next; at most max_flips
+    flips are made (no limit if max_flips is None).  Return the flips made.
+    """
+    gain = self._gain
+    todo = list(ids)
+    flips = 0
+    while todo and (self.max_flips is None or flips < self.max_flips):
+      x = todo.pop()
+      if gain[x] > 0:
+        self._flip(x)
+        flips += 1
+        todo.extend(y for y in self._adj[x] if gain[y] > 0)
+    return flips
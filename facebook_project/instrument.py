@@ -0,0 +1,108 @@
+import tracemalloc
+from contextlib import nullcontext
+from time import perf_counter
+
+class Profile:
+  """Per-phase timers, counters and peak memory of the solvers.
+
+  Pass a Profile as the profile argument of facebook_friend, facebook_enmy,
+  the max-flow functions or the Graph algorithms.  Phases are timed (and,
+  if memory is True, their tracemalloc peak is sampled); counters are
+  added up and high-water marks keep their maximum.  finish() returns the
+  report as a dict and hands it to callback, if one was given.
+  """
+
+  def __init__(self, callback=None, memory=False):
+    self._callback = callback
+    self._memory = memory
+    self._started_tracing = False
+    self._phases = {}
+    self._counters = {}
+    self._stack = []                   # [name, start, running peak]
+
+  def phase(self, name):
+    """Return a context manager timing the phase called name."""
+    return _Phase(self, name)
+
+  def count(self, name, n=1):
+    """Add n to the counter called name."""
+    self._counters[name] = self._counters.get(name, 0) + n
+
+  def high_water(self, name, value):
+    """Raise the counter called name to value if value is larger."""
+    if value > self._counters.get(name, value - 1):
+      self._counters[name] = value
+
+  def _enter(self, name):
+    peak = None
+    if self._memory:
+      if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        self._started_tracing = True
+      if self._stack:                  # keep what the outer phase has seen
+        outer = self._stack[-1]
+        outer[2] = max(outer[2], tracemalloc.get_traced_memory()[1])
+      tracemalloc.reset_peak()
+      peak = 0
+    self._stack.append([name, perf_counter(), peak])
+
+  def _exit(self):
+    name, start, peak = self._stack.pop()
+    record = self._phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+    record['seconds'] += perf_counter() - start
+    record['calls'] += 1
+    if peak is not None:
+      peak = max(peak, tracemalloc.get_traced_memory()[1])
+      record['peak_bytes'] = max(record.get('peak_bytes', 0), peak)
+      if self._stack:
+        outer = self._stack[-1]
+        outer[2] = max(outer[2], peak)
+
+  def report(self):
+    """Return {'phases': {name: {...}}, 'counters': {name: value}}."""
+    return {
+      'phases': {name: dict(record) for name, record in self._phases.items()},
+      'counters': dict(self._counters),
+    }
+
+  def finish(self):
+    """Return the report and pass it to the callback, if any."""
+    if self._started_tracing and not self._stack:
+      tracemalloc.stop()
+      self._started_tracing = False
+    result = self.report()
+    if self._callback is not None:
+      self._callback(result)
+    return result
+
+class _Phase:
+  __slots__ = '_profile', '_name'
+
+  def __init__(self, profile, name):
+    self._profile = profile
+    self._name = name
+
+  def __enter__(self):
+    self._profile._enter(self._name)
+    return self
+
+  def __exit__(self, *exc):
+    self._profile._exit()
+
+class _NoProfile:
+  """Stand-in used when profiling is disabled: every hook does nothing."""
+  _phase = nullcontext()
+
+  def phase(self, name):
+    return self._phase
+
+  def count(self, name, n=1):
+    pass
+
+  def high_water(self, name, value):
+    pass
+
+  def finish(self):
+    return None
+
+NO_PROFILE = _NoProfile()
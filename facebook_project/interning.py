@@ -0,0 +1,63 @@
+from array import array
+
+class Interner:
+  """Dense integer ids for user names.
+
+  Names are mapped to 0, 1, 2, ... once, when the input is loaded; the
+  solvers then work on the ids only, and names are looked up again when a
+  result is returned.
+  """
+  __slots__ = '_names', '_ids'
+
+  def __init__(self, names=()):
+    """Create a table holding names, in order (duplicates share an id)."""
+    self._names = []
+    self._ids = {}
+    for x in names:
+      self.intern(x)
+
+  def __len__(self):
+    return len(self._names)
+
+  def __contains__(self, x):
+    return x in self._ids
+
+  def __iter__(self):
+    return iter(self._names)
+
+  def intern(self, x):
+    """Return the id of x, giving it the next free id if it is new."""
+    i = self._ids.get(x)
+    if i is None:
+      i = self._ids[x] = len(self._names)
+      self._names.append(x)
+    return i
+
+  def id(self, x):
+    """Return the id of x; raise KeyError if x has none."""
+    return self._ids[x]
+
+  def get(self, x, default=None):
+    """Return the id of x, or default if x has none."""
+    return self._ids.get(x, default)
+
+  def name(self, i):
+    """Return the name with id i."""
+    return self._names[i]
+
+  def names(self, ids=None):
+    """Return the list of names of ids (of every id if ids is None)."""
+    if ids is None:
+      return list(self._names)
+    names = self._names
+    return [names[i] for i in ids]
+
+  def edges(self, E):
+    """Return (sources, targets, weights): the edges of E as id columns.
+
+    Raise KeyError if an endpoint has no id.
+    """
+    ids = self._ids
+    sources = array('q', [ids[a] for a, b in E])
+    targets = array('q', [ids[b] for a, b in E])
+    return sources, targets, list(E.values())
@@ -0,0 +1,289 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappush, heappop
+from itertools import repeat
+from operator import itemgetter
+from random import Random
+from time import time
+from csr import CSRGraph, merge_edges
+from instrument import NO_PROFILE
+from scoring import enemy_score
+
+# side codes of greedy_sides
+UNPLACED = 0
+DEM = 1
+REP = 2
+BOTH = 3                # on a loop before any other edge: in d and in r
+
+def greedy_sides(n, sources, targets, weights):
+  """Return the sides facebook_enmy's greedy gives users 0..n-1.
+
+  Edges are taken by decreasing weight, ties in input order.  An edge
+  between two fresh users puts the first in r and the second in d;
+  otherwise the fresh endpoint goes opposite to the placed one.  The
+  result is a bytearray of side codes (UNPLACED, DEM, REP or BOTH).
+  """
+  side = bytearray(n)
+  for k in sorted(range(len(weights)), key=weights.__getitem__, reverse=True):
+    a = sources[k]
+    b = targets[k]
+    sa = side[a]
+    sb = side[b]
+    if not sa:
+      if not sb:
+        side[b] = DEM
+        side[a] = BOTH if a == b else REP
+      else:
+        side[a] = DEM if sb != DEM else REP
+    elif not sb:
+      side[b] = DEM if sa != DEM else REP
+  return side
+
+def improve_sides(g, side, refine=False, max_moves=None, time_limit=None,
+                  restarts=0, workers=None, seed=0):
+  """Improve greedy side codes on g in place by refinement and restarts.
+
+  With refine the placed users go through refine_sides; with restarts the
+  best of multistart_sides replaces them if it cuts more weight.  Either
+  way every placed user ends up in DEM or REP.
+  """
+  off = g._offsets
+  placed = [v for v in range(len(side)) if side[v]]
+  bits = bytearray(side[v] >= REP for v in range(len(side)))
+  if refine:
+    movable = [v for v in placed if off[v + 1] > off[v]]
+    refine_sides(g, bits, movable, max_moves, time_limit)
+  if restarts:
+    best, other = multistart_sides(g, restarts, workers, seed, max_moves, time_limit)
+    if best > cut_weight(g, bits):
+      bits = other
+  for v in placed:
+    side[v] = REP if bits[v] else DEM
+
+def enmy_arrays(sources, targets, weights, n=None, refine=False, max_moves=None,
+                time_limit=None, restarts=0, workers=None, profile=None):
+  """Run facebook_enmy on integer edge columns, without any user names.
+
+  Edge k joins users sources[k] and targets[k] (ids 0..n-1; n defaults to
+  the largest id plus one) with weight weights[k].  The columns may be
+  lists, arrays or memoryviews, such as those of a graphfile.GraphFile.
+  Return the side codes as a bytearray (UNPLACED, DEM, REP or BOTH).
+  profile, if given, times the 'greedy' and 'refine' phases.
+  """
+  if n is None:
+    n = max(max(sources, default=-1), max(targets, default=-1)) + 1
+  profile = profile or NO_PROFILE
+  with profile.phase('greedy'):
+    side = greedy_sides(n, sources, targets, weights)
+  if refine or restarts:
+    side = refine_arrays(sources, targets, weights, side, refine, max_moves,
+                         time_limit, restarts, workers, profile)
+  return side
+
+def refine_arrays(sources, targets, weights, side, refine=False, max_moves=None,
+                  time_limit=None, restarts=0, workers=None, profile=None):
+  """Return the side codes of improve_sides run from side, or side itself.
+
+  Refinement maximizes the cut of the merged graph, where (u, v) and
+  (v, u) add up, while enemy_score counts only the key starting on the
+  dem side; the refined sides are kept only if enemy_score rates them
+  above side.  profile, if given, times the 'refine' phase.
+  """
+  with (profile or NO_PROFILE).phase('refine'):
+    g = CSRGraph.from_arrays(range(len(side)), *merge_edges(sources, targets, weights))
+    improved = bytearray(side)
+    improve_sides(g, improved, refine, max_moves, time_limit, restarts, workers)
+    E = dict(zip(zip(sources, targets), weights))
+    if side_score(E, improved) > side_score(E, side):
+      return improved
+  return side
+
+def side_score(E, side):
+  """Return enemy_score of side codes, E mapping (id, id) pairs to weights."""
+  dem = {v for v, s in enumerate(side) if s & DEM}
+  rep = {v for v, s in enumerate(side) if s & REP}
+  return enemy_score(E, dem, rep)
+
+def cut_gains(g, side):
+  """Return the gain of flipping every vertex of g across the cut.
+
+  gain[v] is the weight v has towards its own side minus the weight it has
+  towards the other one, i.e. how much the cut grows if v changes side.
+  """
+  off, tg, wt = g._offsets, g._targets, g._weights
+  gain = [0] * g.vertex_count()
+  for v in range(len(gain)):
+    sv = side[v]
+    total = 0
+    for a in range(off[v], off[v + 1]):
+      if tg[a] != v:                   # a loop never crosses the cut
+        total += wt[a] if side[tg[a]] == sv else -wt[a]
+    gain[v] = total
+  return gain
+
+def _flip(g, side, gain, v):
+  """Move v to the other side, updating the gains of v and its neighbours."""
+  off, tg, wt = g._offsets, g._targets, g._weights
+  side[v] ^= 1
+  gain[v] = -gain[v]
+  sv = side[v]
+  for a in range(off[v], off[v + 1]):
+    u = tg[a]
+    if u != v:
+      gain[u] += 2 * wt[a] if side[u] == sv else -2 * wt[a]
+
+def refine_sides(g, side, movable=None, max_moves=None, time_limit=None):
+  """Improve the cut of g by Fiduccia-Mattheyses passes of single flips.
+
+  side[v] (0 or 1) is updated in place.  Each pass flips every movable
+  vertex once, highest gain first (gains are kept in buckets and updated in
+  O(degree) per flip), then rolls back to the best prefix of the pass.
+  Passes repeat until one brings no improvement, max_moves flips have been
+  made or time_limit seconds have passed.  Return the total gain in cut
+  weight.
+  """
+  off, tg, wt = g._offsets, g._targets, g._weights
+  n = g.vertex_count()
+  if movable is None:
+    movable = [v for v in range(n) if off[v + 1] > off[v]]
+  fixed = bytearray([1]) * n            # vertices outside movable never move
+  for v in movable:
+    fixed[v] = 0
+  gain = cut_gains(g, side)
+  deadline = None if time_limit is None else time() + time_limit
+  moves = 0
+  total = 0
+  exhausted = False
+  while not exhausted:
+    buckets = {}
+    heap = []
+    for v in movable:
+      bucket = buckets.get(gain[v])
+      if bucket is None:
+        bucket = buckets[gain[v]] = {}
+        heappush(heap, -gain[v])
+      bucket[v] = None
+    locked = bytearray(fixed)
+    trail = []
+    run = best = 0
+    best_len = 0
+    while heap:
+      if (max_moves is not None and moves >= max_moves) or \
+         (deadline is not None and moves % 64 == 0 and time() >= deadline):
+        exhausted = True
+        break
+      top = -heap[0]
+      bucket = buckets.get(top)
+      if not bucket:
+        heappop(heap)
+        buckets.pop(top, None)
+        continue
+      v = next(iter(bucket))
+      del bucket[v]
+      locked[v] = 1
+      side[v] ^= 1
+      gain[v] = -top
+      sv = side[v]
+      for a in range(off[v], off[v + 1]):
+        u = tg[a]
+        if u == v:
+          continue
+        delta = 2 * wt[a] if side[u] == sv else -2 * wt[a]
+        old = gain[u]
+        gain[u] = old + delta
+        if not locked[u]:
+          del buckets[old][u]
+          bucket = buckets.get(old + delta)
+          if bucket is None:
+            bucket = buckets[old + delta] = {}
+            heappush(heap, -(old + delta))
+          bucket[u] = None
+      moves += 1
+      run += top
+      trail.append(v)
+      if run > best:
+        best = run
+        best_len = len(trail)
+    for v in reversed(trail[best_len:]):
+      _flip(g, side, gain, v)
+    total += best
+    if best <= 0:
+      break
+  return total
+
+def cut_weight(g, side):
+  """Return the total weight of the edges of g crossing the cut side."""
+  off, tg, wt = g._offsets, g._targets, g._weights
+  total = 0
+  for v in range(g.vertex_count()):
+    sv = side[v]
+    for a in range(off[v], off[v + 1]):
+      if side[tg[a]] != sv:
+        total += wt[a]
+  return total // 2
+
+def random_greedy_sides(g, rng):
+  """Return the sides given by a randomized version of facebook_enmy's greedy.
+
+  Edges are taken by decreasing weight with ties in random order; an edge
+  between two fresh users puts them on random opposite sides, otherwise the
+  fresh endpoint goes opposite to the placed one.
+  """
+  off, tg, wt = g._offsets, g._targets, g._weights
+  n = g.vertex_count()
+  edges = [(wt[a], rng.random(), u, tg[a])
+           for u in range(n) for a in range(off[u], off[u + 1]) if tg[a] > u]
+  edges.sort(reverse=True)
+  side = bytearray(n)
+  placed = bytearray(n)
+  for w, key, u, v in edges:
+    if not placed[u]:
+      if not placed[v]:
+        side[u] = key < 0.5
+        side[v] = not side[u]
+        placed[v] = 1
+      else:
+        side[u] = not side[v]
+      placed[u] = 1
+    elif not placed[v]:
+      side[v] = not side[u]
+      placed[v] = 1
+  return side
+
+#------------------------- multi-start search -------------------------
+_shared = None          # the graph a worker process restarts on
+
+def _init_worker(g):
+  global _shared
+  _shared = g
+
+def _restart(seed, max_moves=None, time_limit=None):
+  """One randomized greedy-plus-refine run on the shared graph."""
+  g = _shared
+  side = random_greedy_sides(g, Random(seed))
+  refine_sides(g, side, None, max_moves, time_limit)
+  return cut_weight(g, side), bytes(side)
+
+def multistart_sides(g, restarts, workers=None, seed=0, max_moves=None, time_limit=None):
+  """Return (weight, side) of the best of several randomized restarts.
+
+  Restart i is seeded with seed + i, so results do not depend on workers.
+  The graph is handed to each worker process once, when the pool starts,
+  and never pickled per task.  With workers == 1 all restarts run here.
+  """
+  if workers is None:
+    workers = os.cpu_count() or 1
+  workers = min(workers, restarts)
+  seeds = range(seed, seed + restarts)
+  if workers <= 1:
+    _init_worker(g)
+    try:
+      results = [_restart(x, max_moves, time_limit) for x in seeds]
+    finally:
+      _init_worker(None)
+  else:
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(g,)) as pool:
+      results = list(pool.map(_restart, seeds, repeat(max_moves, restarts),
+                              repeat(time_limit, restarts)))
+  weight, side = max(results, key=itemgetter(0))
+  return weight, bytearray(side)
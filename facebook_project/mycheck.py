@@ -0,0 +1,101 @@
+from itertools import product
+from random import Random
+from facebook import facebook_friend
+from incremental import FriendSolver
+
+def cut_cost(V, E, repu):
+    """Return the weight of the network cut putting the users of repu on t.
+
+    Unlike friend_score, (a, b) and (b, a) are two edges, as in the network.
+    """
+    cost = 0
+    for x in V:
+        cost += V[x][0] if x in repu else V[x][1]
+    for (a, b), w in E.items():
+        if (a in repu) != (b in repu):
+            cost += w
+    return cost
+
+def brute_force_friend(V, E):
+    """Return (cost, dem, repu) of the cut facebook_friend must pick.
+
+    Every assignment of the users is tried.  Among the cheapest ones the
+    canonical cut puts on the repu side only the users that are there in
+    all of them, which is the sink side max_flow and sink_side find.
+    """
+    users = list(V)
+    best = None
+    always = None
+    for sides in product((False, True), repeat=len(users)):
+        repu = set(x for x, side in zip(users, sides) if side)
+        cost = cut_cost(V, E, repu)
+        if best is None or cost < best:
+            best = cost
+            always = repu
+        elif cost == best:
+            always &= repu
+    dem = [x for x in users if x not in always]
+    repu = [x for x in users if x in always]
+    return best, dem, repu
+
+def random_instance(rng, n, m):
+    V = {}
+    for i in range(n):
+        V['u%d' % i] = (rng.randint(0, 6), rng.randint(0, 6))
+    users = list(V)
+    E = {}
+    for k in range(m):
+        E[(rng.choice(users), rng.choice(users))] = rng.randint(0, 6)
+    return V, E
+
+def check_reduction(trials=300, seed=0):
+    """Compare facebook_friend, with and without reduce, to brute force."""
+    rng = Random(seed)
+    failures = 0
+    for trial in range(trials):
+        V, E = random_instance(rng, rng.randint(1, 8), rng.randint(0, 14))
+        cost, dem, repu = brute_force_friend(V, E)
+        for method in ('dinic', 'push_relabel'):
+            for reduce in (False, True):
+                d, r = facebook_friend(V, E, method, reduce=reduce)
+                if (d, r) != (dem, repu) or cut_cost(V, E, set(r)) != cost:
+                    failures += 1
+                    print('reduction', trial, method, reduce, V, E)
+    return failures
+
+def check_incremental(trials=100, steps=20, seed=0):
+    """Compare FriendSolver after every random change to a full solve."""
+    rng = Random(seed)
+    failures = 0
+    for trial in range(trials):
+        V, E = random_instance(rng, rng.randint(1, 6), rng.randint(0, 10))
+        merged = {}
+        for (a, b), w in E.items():
+            if a != b:
+                key = (a, b) if a < b else (b, a)
+                merged[key] = merged.get(key, 0) + w
+        solver = FriendSolver(V, E)
+        solver.solve()
+        for step in range(steps):
+            users = list(V)
+            if rng.random() < 0.4:
+                x = rng.choice(users) if rng.random() < 0.8 else 'u%d' % len(V)
+                V[x] = (rng.randint(0, 6), rng.randint(0, 6))
+                solver.set_preference(x, *V[x])
+            else:
+                a, b = rng.sample(users, 2) if len(users) > 1 else (users[0], users[0])
+                if a == b:
+                    continue
+                key = (a, b) if a < b else (b, a)
+                merged[key] = rng.randint(0, 6)   # often lower: flow is rerouted
+                solver.set_edge(a, b, merged[key])
+            cost, dem, repu = brute_force_friend(V, merged)
+            if solver.solve() != (dem, repu) or solver.flow_value() != cost:
+                failures += 1
+                print('incremental', trial, step, V, merged)
+    return failures
+
+if __name__ == '__main__':
+    failures = check_reduction() + check_incremental()
+    print('failures: %d' % failures)
+    raise SystemExit(1 if failures else 0)
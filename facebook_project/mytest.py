@@ -1,6 +1,7 @@
 #from func_timeout import func_timeout
 from time import time
 from facebook import facebook_friend, facebook_enmy
+from scoring import enemy_score, friend_score
 
 def read_graph1(filename):
     infile = open(filename, 'r')
@@ -44,13 +45,7 @@ def mytest1():
 #        dem, rep = func_timeout(10800,facebook_enmy,(V, E))
         dem, rep = facebook_enmy(V,E)
         end = time()-start
-        result = 0
-        for i in dem:
-            for j in rep:
-                if (i, j) in E.keys():
-                    result += E[(i,j)]
-                elif (j, i) in E.keys():
-                    result += E[(j,i)]
+        result = enemy_score(E, dem, rep)
         outfile.write(str(result)+"\n")
         outfile.write(str(end))
     except Exception as e:
@@ -66,17 +61,7 @@ def mytest2():
 #        dem, rep = func_timeout(10800,facebook_friend,(V, E))
         dem, rep = facebook_friend(V, E)
         end = time()-start
-        result = 0
-        for i in dem:
-            result += V[i][1]
-        for i in rep:
-            result += V[i][0]
-        for i in dem:
-            for j in rep:
-                if (i, j) in E.keys():
-                    result += E[(i,j)]
-                elif (j, i) in E.keys():
-                    result += E[(j,i)]
+        result = friend_score(V, E, dem, rep)
         outfile.write(str(result)+"\n")
         outfile.write(str(end))
     except Exception as e:
@@ -84,5 +69,6 @@ def mytest2():
         outfile.write(str(e))
     outfile.close()
     
-#mytest1()
-mytest2()
+if __name__ == '__main__':
+    #mytest1()
+    mytest2()
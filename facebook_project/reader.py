@@ -0,0 +1,136 @@
+from array import array
+from csr import CSRGraph
+
+CHUNK_SIZE = 1 << 24        # bytes read per block
+EDGES_MARKERS = (b'Edges\n', b'Edges\r\n')   # as read_graph2 reads text mode
+
+def _blocks(infile, chunk_size):
+    """Yield the file in blocks of whole lines, each about chunk_size bytes."""
+    tail = b''
+    while True:
+        block = infile.read(chunk_size)
+        if not block:
+            break
+        block = tail + block
+        cut = block.rfind(b'\n') + 1
+        if cut == 0:
+            tail = block
+            continue
+        tail = block[cut:]
+        yield block[:cut]
+    if tail:
+        yield tail
+
+def _triples(block):
+    """Return the three columns of a block of 'x y z' lines."""
+    tokens = block.split()
+    lines = block.count(b'\n') + (not block.endswith(b'\n'))
+    if len(tokens) != 3 * lines:
+        # some line has extra fields: keep the first three of every line
+        tokens = [t for line in block.splitlines() for t in line.split()[:3]]
+    return tokens[0::3], tokens[1::3], tokens[2::3]
+
+def _intern(index, names):
+    """Return the ids of names, giving fresh ids to the unseen ones."""
+    get = index.setdefault
+    return array('q', [get(x, len(index)) for x in names])
+
+def _intern_edges(index, a, b):
+    """Return the ids of the a and b columns, interned line by line."""
+    ends = [None] * (2 * len(a))
+    ends[0::2] = a
+    ends[1::2] = b
+    ids = _intern(index, ends)
+    return ids[0::2], ids[1::2]
+
+def _last_wins(sources, targets, weights):
+    """Merge repeated (source, target) edges the way a dict of edges does.
+
+    An edge keeps the position of its first line and the weight of its last,
+    as E[(a, b)] = w in read_graph1/read_graph2.
+    """
+    last = {(u, v): k for k, (u, v) in enumerate(zip(sources, targets))}
+    if len(last) == len(weights):
+        return sources, targets, weights
+    keep = list(last.values())
+    return (array('q', [sources[k] for k in keep]),
+            array('q', [targets[k] for k in keep]),
+            array('q', [weights[k] for k in keep]))
+
+def scan_graph1(filename, chunk_size=CHUNK_SIZE):
+    """Read a read_graph1 edge list into (names, sources, targets, weights).
+
+    Node names are interned to ids in order of first appearance, reading
+    each line from left to right; edges are returned as parallel integer
+    arrays, one entry per line, except that a repeated line only updates
+    the weight of the first, as in read_graph1.  Fields after the third of
+    a line are ignored.
+    """
+    index = {}
+    sources = array('q')
+    targets = array('q')
+    weights = array('q')
+    with open(filename, 'rb') as infile:
+        for block in _blocks(infile, chunk_size):
+            a, b, w = _triples(block)
+            a, b = _intern_edges(index, a, b)
+            sources.extend(a)
+            targets.extend(b)
+            weights.extend(array('q', map(int, w)))
+    names = [x.decode() for x in index]
+    sources, targets, weights = _last_wins(sources, targets, weights)
+    return names, sources, targets, weights
+
+def scan_graph2(filename, chunk_size=CHUNK_SIZE):
+    """Read a read_graph2 file into (names, dem, rep, sources, targets, weights).
+
+    dem[i] and rep[i] are the two preferences of names[i]; the edges of the
+    "Edges" section are returned as in scan_graph1.  Lines may end in LF
+    or CRLF, as read_graph2 accepts both in text mode.
+    """
+    index = {}
+    dem = array('q')
+    rep = array('q')
+    sources = array('q')
+    targets = array('q')
+    weights = array('q')
+    edge_mode = False
+    with open(filename, 'rb') as infile:
+        for block in _blocks(infile, chunk_size):
+            if not edge_mode:
+                for marker in EDGES_MARKERS:
+                    at = (b'\n' + block).find(b'\n' + marker)
+                    if at >= 0:
+                        break
+                if at < 0:
+                    nodes, block = block, b''
+                else:
+                    nodes, block = block[:at], block[at + len(marker):]
+                    edge_mode = True
+                x, d, r = _triples(nodes)
+                _intern(index, x)
+                dem.extend(array('q', map(int, d)))
+                rep.extend(array('q', map(int, r)))
+                if len(index) != len(dem):
+                    raise ValueError('a user is listed twice in V.')
+            if block:
+                a, b, w = _triples(block)
+                a, b = _intern_edges(index, a, b)
+                sources.extend(a)
+                targets.extend(b)
+                weights.extend(array('q', map(int, w)))
+    if len(index) != len(dem):
+        raise ValueError('the arc in E is not present in V.')
+    names = [x.decode() for x in index]
+    sources, targets, weights = _last_wins(sources, targets, weights)
+    return names, dem, rep, sources, targets, weights
+
+def load_graph1(filename, chunk_size=CHUNK_SIZE):
+    """Return the CSRGraph of a read_graph1 file, built in a single step."""
+    names, sources, targets, weights = scan_graph1(filename, chunk_size)
+    return CSRGraph.from_arrays(names, sources, targets, weights)
+
+def load_graph2(filename, chunk_size=CHUNK_SIZE):
+    """Return the CSRGraph of a read_graph2 file, preferences included."""
+    names, dem, rep, sources, targets, weights = scan_graph2(filename, chunk_size)
+    return CSRGraph.from_arrays(names, sources, targets, weights, dem, rep)
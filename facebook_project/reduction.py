@@ -0,0 +1,142 @@
+from array import array
+from flow import cut_network
+
+# states of an item during the reduction
+OPEN = 0
+SOURCE = 1              # fixed on the s side
+SINK = 2                # fixed on the t side
+LEAF = 3                # follows its only neighbour, decided after the solve
+
+class CutReduction:
+  """Items of a cut_network problem decided before the network is built.
+
+  Three rules are applied until none fires, each one keeping the cut that
+  max_flow and FlowNetwork.sink_side pick (the minimum cut with the fewest
+  items on the t side) on the items that are left:
+
+  - an item whose source capacity covers its sink capacity plus all of its
+    edge weights is put on the s side and merged into s;
+  - an item whose sink capacity exceeds its source capacity plus all of its
+    edge weights is put on the t side and merged into t;
+  - an item with a single neighbour is removed, and the neighbour's
+    capacities are raised by what the removed item would cost on each side.
+    Its side is decided from the neighbour's once the rest is solved.
+
+  Items without edges fall under the first two rules.  cut_offset is the
+  weight of the cut arcs that no longer appear in the reduced network.
+  """
+
+  def __init__(self, n, sources, targets, weights, source_caps, sink_caps):
+    adj = [{} for _ in range(n)]
+    for u, v, w in zip(sources, targets, weights):
+      if u != v and w:
+        adj[u][v] = adj[u].get(v, 0) + w
+        adj[v][u] = adj[v].get(u, 0) + w
+    dem = list(source_caps)
+    rep = list(sink_caps)
+    total = [sum(a.values()) for a in adj]
+    state = bytearray(n)
+    leaves = []                        # (item, neighbour, weight), in order
+    offset = 0
+    isolated = 0
+    todo = list(range(n - 1, -1, -1))
+    while todo:
+      u = todo.pop()
+      if state[u] != OPEN:
+        continue
+      a = adj[u]
+      if not a:
+        isolated += 1
+      if dem[u] >= rep[u] + total[u]:
+        state[u] = SOURCE
+        offset += rep[u]
+        for v, w in a.items():
+          dem[v] += w
+      elif rep[u] > dem[u] + total[u]:
+        state[u] = SINK
+        offset += dem[u]
+        for v, w in a.items():
+          rep[v] += w
+      elif len(a) == 1:
+        state[u] = LEAF
+        (v, w), = a.items()
+        on_source = min(rep[u], dem[u] + w)  # cost of u if v is on the s side
+        on_sink = min(rep[u] + w, dem[u])    # cost of u if v is on the t side
+        c = min(on_source, on_sink)
+        rep[v] += on_source - c
+        dem[v] += on_sink - c
+        offset += c
+        leaves.append((u, v, w))
+      else:
+        continue
+      for v, w in a.items():
+        del adj[v][u]
+        total[v] -= w
+        todo.append(v)
+      a.clear()
+      total[u] = 0
+    self._n = n
+    self._adj = adj
+    self._dem = dem
+    self._rep = rep
+    self._state = state
+    self._leaves = leaves
+    self._core = [u for u in range(n) if state[u] == OPEN]
+    self.cut_offset = offset
+    self._isolated = isolated
+
+  def core(self):
+    """Return the items left open, in increasing order."""
+    return list(self._core)
+
+  def stats(self):
+    """Return a dict counting what the reduction removed and what is left."""
+    state = self._state
+    left = self._core
+    return {
+      'items': self._n,
+      'isolated': self._isolated,
+      'fixed_source': state.count(SOURCE),
+      'fixed_sink': state.count(SINK),
+      'leaves': len(self._leaves),
+      'items_left': len(left),
+      'edges_left': sum(len(self._adj[u]) for u in left) // 2,
+      'cut_offset': self.cut_offset,
+    }
+
+  def network(self):
+    """Return (net, s, t): the cut_network of the open items.
+
+    Item k of the network is core()[k]; the reduced capacities are used.
+    """
+    core = self._core
+    local = {u: k for k, u in enumerate(core)}
+    sources = array('q')
+    targets = array('q')
+    weights = []
+    for k, u in enumerate(core):
+      for v, w in self._adj[u].items():
+        if u < v:
+          sources.append(k)
+          targets.append(local[v])
+          weights.append(w)
+    return cut_network(len(core), sources, targets, weights,
+                       [self._dem[u] for u in core], [self._rep[u] for u in core])
+
+  def sink_side(self, mark=()):
+    """Return the t side marks of all n items.
+
+    mark holds the marks of the reduced network (its sink_side), of which
+    only the first len(core()) entries are read.
+    """
+    state = self._state
+    side = [s == SINK for s in state]
+    for k, u in enumerate(self._core):
+      side[u] = bool(mark[k])
+    dem, rep = self._dem, self._rep
+    for u, v, w in reversed(self._leaves):
+      if side[v]:
+        side[u] = dem[u] < rep[u] + w
+      else:
+        side[u] = dem[u] + w < rep[u]
+    return side
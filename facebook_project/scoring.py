@@ -0,0 +1,32 @@
+def enemy_score(E, dem, rep):
+    """Return the mytest1 objective: weight of the enemies split by (dem, rep).
+
+    One pass over E, adding up what mytest1's loop over every i in dem and
+    j in rep adds: E[(i, j)] if that key exists, E[(j, i)] otherwise.  So a
+    pair joined by both keys is counted with the key that starts on the dem
+    side, and a user in both dem and rep also pairs with itself.
+    """
+    dem = dem if isinstance(dem, (set, frozenset, dict)) else set(dem)
+    rep = rep if isinstance(rep, (set, frozenset, dict)) else set(rep)
+    result = 0
+    for (a, b), w in E.items():
+        if a in dem and b in rep:
+            result += w
+        if a != b and a in rep and b in dem and (b, a) not in E:
+            result += w
+    return result
+
+def friend_score(V, E, dem, rep):
+    """Return the mytest2 objective: preferences and friendships given up.
+
+    A user in dem costs V[user][1], one in rep costs V[user][0], and every
+    friendship split by (dem, rep) costs its weight as in enemy_score.
+    """
+    dem = dem if isinstance(dem, (set, frozenset, dict)) else set(dem)
+    rep = rep if isinstance(rep, (set, frozenset, dict)) else set(rep)
+    result = 0
+    for i in dem:
+        result += V[i][1]
+    for i in rep:
+        result += V[i][0]
+    return result + enemy_score(E, dem, rep)
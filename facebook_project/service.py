@@ -0,0 +1,253 @@
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import count
+from time import perf_counter
+from cache import content_hash
+from facebook import facebook_enmy, facebook_friend
+
+SOLVERS = {
+  'enmy': facebook_enmy,
+  'friend': facebook_friend,
+}
+LATENCY_WINDOW = 1024   # latencies kept for the stats
+MAX_LINE = 1 << 28      # longest request line the server reads
+
+def encode_request(solver, V, E, options=None, rid=None):
+  """Return the JSON line of a request: V as a list or a dict, E as triples."""
+  msg = {
+    'id': rid,
+    'solver': solver,
+    'V': {x: list(p) for x, p in V.items()} if isinstance(V, dict) else list(V),
+    'E': [[a, b, w] for (a, b), w in E.items()],
+    'options': options or {},
+  }
+  return (json.dumps(msg) + '\n').encode()
+
+def decode_request(msg):
+  """Return the (V, E) pair of a decoded request."""
+  V = msg['V']
+  if isinstance(V, dict):
+    V = {x: tuple(p) for x, p in V.items()}
+  E = {(a, b): w for a, b, w in msg['E']}
+  return V, E
+
+class PartitionService:
+  """asyncio front-end running facebook_enmy / facebook_friend solves.
+
+  Solves run on an executor (a process pool of processes workers unless
+  one is given), so the event loop never blocks.  Requests with the same
+  solver, options and input content as one still being solved wait for
+  that solve instead of starting another.  start() serves the JSON-lines
+  protocol of ServiceClient over TCP; solve() can also be awaited directly.
+  """
+
+  def __init__(self, executor=None, processes=None):
+    self._executor = executor
+    self._own_executor = executor is None
+    self._processes = processes
+    self._inflight = {}                # key -> task of the running solve
+    self._waiting = 0
+    self._requests = 0
+    self._coalesced = 0
+    self._completed = 0
+    self._failed = 0
+    self._latency = deque(maxlen=LATENCY_WINDOW)
+    self._server = None
+    self._connections = {}             # handler task -> its writer
+
+  #------------------------- solving -------------------------
+  async def solve(self, solver, V, E, **options):
+    """Return the (D, R) answer of the named solver ('enmy' or 'friend')."""
+    start = perf_counter()
+    self._requests += 1
+    self._waiting += 1
+    try:
+      try:
+        solve = SOLVERS[solver]
+      except KeyError:
+        raise ValueError('unknown solver: {0}'.format(solver)) from None
+      loop = asyncio.get_running_loop()
+      key = await loop.run_in_executor(None, content_hash, V, E, solver,
+                                       sorted(options.items()))
+      task = self._inflight.get(key)
+      if task is None:
+        task = asyncio.ensure_future(self._run(key, solve, V, E, options))
+        self._inflight[key] = task
+      else:
+        self._coalesced += 1
+      d, r = await asyncio.shield(task)
+    except Exception:
+      self._failed += 1
+      raise
+    finally:
+      self._waiting -= 1
+    self._completed += 1
+    self._latency.append(perf_counter() - start)
+    return type(d)(d), type(r)(r)      # every caller gets its own copy
+
+  async def _run(self, key, solve, V, E, options):
+    if self._executor is None:
+      self._executor = ProcessPoolExecutor(self._processes)
+    loop = asyncio.get_running_loop()
+    try:
+      return await loop.run_in_executor(self._executor, partial(solve, V, E, **options))
+    finally:
+      del self._inflight[key]
+
+  def stats(self):
+    """Return a dict of queue depth, request counts and latencies (seconds).
+
+    'in_flight' counts distinct solves running or queued on the executor
+    and 'waiting' the requests waiting for one of them.
+    """
+    lat = sorted(self._latency)
+    pick = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+    return {
+      'in_flight': len(self._inflight),
+      'waiting': self._waiting,
+      'requests': self._requests,
+      'coalesced': self._coalesced,
+      'completed': self._completed,
+      'failed': self._failed,
+      'latency': {
+        'count': len(lat),
+        'mean': sum(lat) / len(lat) if lat else 0.0,
+        'p50': pick(0.5),
+        'p95': pick(0.95),
+        'max': lat[-1] if lat else 0.0,
+      },
+    }
+
+  #------------------------- server -------------------------
+  async def start(self, host='127.0.0.1', port=0):
+    """Start serving on host:port (any free port if 0); return (host, port)."""
+    self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_LINE)
+    return self._server.sockets[0].getsockname()[:2]
+
+  async def close(self):
+    """Stop the server and shut down the executor this service created."""
+    if self._server is not None:
+      self._server.close()
+      await self._server.wait_closed()
+      self._server = None
+    for writer in self._connections.values():
+      writer.close()                   # the handler then reads end of file
+    if self._connections:
+      await asyncio.gather(*self._connections, return_exceptions=True)
+    if self._own_executor and self._executor is not None:
+      self._executor.shutdown()
+      self._executor = None
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, *exc):
+    await self.close()
+
+  async def _handle(self, reader, writer):
+    """Answer the requests of one connection, concurrently and by id."""
+    lock = asyncio.Lock()
+    tasks = set()
+    me = asyncio.current_task()
+    self._connections[me] = writer
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        task = asyncio.ensure_future(self._answer(line, writer, lock))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+      if tasks:
+        await asyncio.gather(*tasks)
+    finally:
+      del self._connections[me]
+      writer.close()
+
+  async def _answer(self, line, writer, lock):
+    rid = None
+    try:
+      msg = json.loads(line)
+      rid = msg.get('id')
+      if msg.get('op') == 'stats':
+        reply = {'id': rid, 'stats': self.stats()}
+      else:
+        V, E = decode_request(msg)
+        d, r = await self.solve(msg['solver'], V, E, **msg.get('options', {}))
+        reply = {'id': rid,
+                 'D': sorted(d) if isinstance(d, set) else d,
+                 'R': sorted(r) if isinstance(r, set) else r}
+    except Exception as e:
+      reply = {'id': rid, 'error': '{0}: {1}'.format(type(e).__name__, e)}
+    async with lock:
+      try:
+        writer.write((json.dumps(reply) + '\n').encode())
+        await writer.drain()
+      except ConnectionError:
+        pass                           # the client has gone away
+
+class ServiceClient:
+  """Client of a PartitionService server; many requests may be pending."""
+
+  def __init__(self, reader, writer):
+    self._reader = reader
+    self._writer = writer
+    self._ids = count()
+    self._pending = {}                 # request id -> future of its reply
+    self._listener = asyncio.ensure_future(self._listen())
+
+  @classmethod
+  async def connect(cls, host, port):
+    """Open a connection to the server at host:port."""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    return cls(reader, writer)
+
+  async def solve(self, solver, V, E, **options):
+    """Return the answer to (V, E), as the named solver returns it.
+
+    Raise RuntimeError with the server's message if the request failed.
+    """
+    reply = await self._request(lambda rid: encode_request(solver, V, E, options, rid))
+    if solver == 'enmy':
+      return set(reply['D']), set(reply['R'])
+    return reply['D'], reply['R']
+
+  async def stats(self):
+    """Return the stats() dict of the server's service."""
+    reply = await self._request(lambda rid: (json.dumps({'id': rid, 'op': 'stats'}) + '\n').encode())
+    return reply['stats']
+
+  async def close(self):
+    """Close the connection."""
+    self._writer.close()
+    await self._listener
+
+  async def _request(self, make):
+    rid = next(self._ids)
+    future = self._pending[rid] = asyncio.get_running_loop().create_future()
+    self._writer.write(make(rid))
+    await self._writer.drain()
+    reply = await future
+    if 'error' in reply:
+      raise RuntimeError(reply['error'])
+    return reply
+
+  async def _listen(self):
+    """Hand every reply to the request waiting for it."""
+    try:
+      while True:
+        line = await self._reader.readline()
+        if not line:
+          break
+        reply = json.loads(line)
+        future = self._pending.pop(reply['id'], None)
+        if future is not None and not future.done():
+          future.set_result(reply)
+    finally:
+      for future in self._pending.values():
+        if not future.done():
+          future.set_exception(ConnectionError('connection closed'))
+      self._pending.clear()
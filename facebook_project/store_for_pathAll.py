@@ -1,26 +1,21 @@
+from collections import deque
+
 class MyQUEUE: # just an implementation of a queue
 
     def __init__(self):
-        self.holder = []
+        self.holder = deque()
 
     def enqueue(self,val):
         self.holder.append(val)
 
     def dequeue(self):
         val = None
-        try:
-            val = self.holder[0]
-            if len(self.holder) == 1:
-                self.holder = []
-            else:
-                self.holder = self.holder[1:]
-        except:
-            pass
-
+        if self.holder:
+            val = self.holder.popleft()
         return val
 
     def IsEmpty(self):
-        result = False
-        if len(self.holder) == 0:
-            result = True
-        return result
+        return len(self.holder) == 0
+
+    def __len__(self):
+        return len(self.holder)